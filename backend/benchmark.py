@@ -0,0 +1,298 @@
+"""
+Load-testing / benchmark harness for the ForeSky API.
+
+Seeds a database with users x notes x tags, then drives the auth, notes CRUD,
+tags and stats endpoints in-process with concurrent clients and reports
+p50/p95/p99 latency and SQL queries per request for each endpoint:
+
+    python benchmark.py --users 20 --notes 200 --tags 10 --clients 10 --iterations 20
+
+Uses a fresh SQLite file by default; pass --database-url for a Postgres instance
+(seeded rows get a per-run email prefix, nothing is dropped).
+Exits with status 1 when --max-p95-ms / --max-queries thresholds are exceeded.
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import tempfile
+
+BENCH_PASSWORD = "bench-password"
+
+
+def configure_env(database_url):
+    """Env needed to import the app; must run before importing main/database/security"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    # All clients share one IP; the auth limiters would otherwise throttle the run itself
+    for limiter in ("LOGIN_IP", "LOGIN_EMAIL"):
+        os.environ.setdefault(f"RATE_LIMIT_{limiter}", "1000000/1")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}  # {(method, route): [seconds]}
+        self.errors = {}     # {(method, route): count}
+
+    def record(self, method, route, seconds, status_code):
+        self.latencies.setdefault((method, route), []).append(seconds)
+        if status_code >= 400:
+            self.errors[(method, route)] = self.errors.get((method, route), 0) + 1
+
+
+# --------------------------
+# SEEDING
+# --------------------------
+def seed(SessionLocal, models, security, users, notes_per_user, tags_per_user, run_id):
+    """Bulk-insert verified users with their own tags, notes and tag links; returns the seeded emails"""
+    hashed_password = security.get_password_hash(BENCH_PASSWORD)  # bcrypt once, reused for every user
+    rng = random.Random(run_id)
+    emails = [f"bench-{run_id}-{i}@bench.local" for i in range(users)]
+
+    db = SessionLocal()
+    try:
+        db.execute(models.User.__table__.insert(), [
+            {"email": email, "hashed_password": hashed_password, "is_active": True, "is_verified": True}
+            for email in emails
+        ])
+        user_ids = [row.id for row in db.query(models.User.id).filter(models.User.email.in_(emails))]
+
+        tag_rows = [{"name": f"tag-{i}", "owner_id": user_id} for user_id in user_ids for i in range(tags_per_user)]
+        if tag_rows:
+            db.execute(models.Tag.__table__.insert(), tag_rows)
+        tag_ids_by_owner = {}
+        for tag_id, owner_id in db.query(models.Tag.id, models.Tag.owner_id).filter(models.Tag.owner_id.in_(user_ids)):
+            tag_ids_by_owner.setdefault(owner_id, []).append(tag_id)
+
+        note_rows = [
+            {"title": f"Note {n}", "content": "lorem ipsum " * rng.randint(5, 80), "owner_id": user_id}
+            for user_id in user_ids for n in range(notes_per_user)
+        ]
+        if note_rows:
+            db.execute(models.Note.__table__.insert(), note_rows)
+        notes = db.query(models.Note.id, models.Note.owner_id).filter(models.Note.owner_id.in_(user_ids))
+
+        links = []
+        for note_id, owner_id in notes:
+            tag_ids = tag_ids_by_owner.get(owner_id, [])
+            for tag_id in rng.sample(tag_ids, min(len(tag_ids), rng.randint(0, 3))):
+                links.append({"note_id": note_id, "tag_id": tag_id})
+        if links:
+            db.execute(models.note_tags.insert(), links)
+        db.commit()
+    finally:
+        db.close()
+    return emails
+
+
+# --------------------------
+# CLIENT SCENARIO
+# --------------------------
+async def timed(client, recorder, method, url, route, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    recorder.record(method, route, time.perf_counter() - start, response.status_code)
+    return response
+
+
+async def client_session(client, recorder, email, iterations, tag_pool, rng):
+    response = await timed(client, recorder, "POST", "/auth/login", "/auth/login",
+                           data={"username": email, "password": BENCH_PASSWORD})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for _ in range(iterations):
+        await timed(client, recorder, "GET", "/users/me/", "/users/me/", headers=headers)
+        await timed(client, recorder, "GET", "/users/me/notes/", "/users/me/notes/", headers=headers)
+        await timed(client, recorder, "GET", "/tags/", "/tags/", headers=headers)
+        await timed(client, recorder, "GET", "/users/me/stats", "/users/me/stats", headers=headers)
+
+        tag = (await timed(client, recorder, "POST", "/tags/", "/tags/", headers=headers,
+                           json={"name": rng.choice(tag_pool)})).json()
+        note = (await timed(client, recorder, "POST", "/users/me/notes/", "/users/me/notes/", headers=headers,
+                            json={"title": "bench", "content": "x" * 200, "tag_ids": [tag["id"]]})).json()
+        await timed(client, recorder, "PUT", f"/users/me/notes/{note['id']}", "/users/me/notes/{note_id}",
+                    headers=headers, json={"title": "bench 2", "content": "y" * 200, "tag_ids": []})
+        await timed(client, recorder, "DELETE", f"/users/me/notes/{note['id']}", "/users/me/notes/{note_id}",
+                    headers=headers)
+
+
+async def drive(app, emails, clients, iterations, run_id):
+    import httpx
+
+    recorder = Recorder()
+    # Server errors come back as 500 responses (counted as errors) instead of crashing the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        sessions = [
+            client_session(client, recorder, emails[i % len(emails)], iterations,
+                           [f"bench-{run_id}-live-{i}-{k}" for k in range(5)], random.Random(i))
+            for i in range(clients)
+        ]
+        start = time.perf_counter()
+        await asyncio.gather(*sessions)
+        elapsed = time.perf_counter() - start
+    return recorder, elapsed
+
+
+# --------------------------
+# SERIALIZATION MICRO-BENCHMARK
+# --------------------------
+def compare_serialization(SessionLocal, models, schemas, serializers, email, repeat):
+    """
+    Time GET /users/me/notes/'s serialization for one user: the default path
+    (ORM objects -> List[schemas.Note] validation -> jsonable_encoder -> json) against
+    the fast path (column tuples -> dicts -> orjson). Returns (default_ms, fast_ms, notes).
+    """
+    from typing import List
+    from pydantic import TypeAdapter
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+
+    adapter = TypeAdapter(List[schemas.Note])
+    db = SessionLocal()
+    try:
+        owner_id = db.query(models.User.id).filter(models.User.email == email).scalar()
+
+        def default_path():
+            db.expunge_all()  # no identity-map reuse between runs
+            notes = db.query(models.Note).filter(models.Note.owner_id == owner_id).all()
+            return JSONResponse(jsonable_encoder(adapter.validate_python(notes))).body
+
+        def fast_path():
+            return ORJSONResponse(serializers.note_rows(db, owner_id)).body
+
+        if json.loads(default_path()) != json.loads(fast_path()):
+            raise AssertionError("fast path output differs from the default serialization")
+
+        timings = []
+        for func in (default_path, fast_path):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            timings.append((time.perf_counter() - start) / repeat * 1000)
+        count = len(json.loads(fast_path()))
+    finally:
+        db.close()
+    return timings[0], timings[1], count
+
+
+# --------------------------
+# REPORT
+# --------------------------
+def summarize(recorder, metrics):
+    """Per-endpoint latency percentiles (ms) joined with SQL queries/request from the metrics middleware"""
+    query_series = metrics.REQUEST_QUERIES.series
+    results = []
+    for (method, route), latencies in sorted(recorder.latencies.items()):
+        series = query_series.get((method, route))
+        queries = series[-2] / series[-1] if series and series[-1] else 0.0
+        results.append({
+            "endpoint": f"{method} {route}",
+            "requests": len(latencies),
+            "errors": recorder.errors.get((method, route), 0),
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "queries_per_request": queries,
+        })
+    return results
+
+
+def print_report(results, elapsed):
+    total = sum(row["requests"] for row in results)
+    print(f"\n{'endpoint':<42}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for row in results:
+        print(f"{row['endpoint']:<42}{row['requests']:>7}{row['errors']:>6}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['queries_per_request']:>9.1f}")
+    print(f"\n{total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s)")
+
+
+def check_thresholds(results, max_p95_ms, max_queries):
+    failures = []
+    for row in results:
+        if row["errors"]:
+            failures.append(f"{row['endpoint']}: {row['errors']} error response(s)")
+        if max_p95_ms is not None and row["p95_ms"] > max_p95_ms and row["endpoint"] != "POST /auth/login":
+            failures.append(f"{row['endpoint']}: p95 {row['p95_ms']:.1f} ms > {max_p95_ms} ms")
+        if max_queries is not None and row["queries_per_request"] > max_queries:
+            failures.append(f"{row['endpoint']}: {row['queries_per_request']:.1f} queries/request > {max_queries}")
+    return failures
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the ForeSky API in-process")
+    parser.add_argument("--database-url", default=None,
+                        help="database to seed and use (default: a fresh SQLite file in a temp dir)")
+    parser.add_argument("--users", type=int, default=10, help="seeded users")
+    parser.add_argument("--notes", type=int, default=100, help="seeded notes per user")
+    parser.add_argument("--tags", type=int, default=5, help="seeded tags per user")
+    parser.add_argument("--clients", type=int, default=10, help="concurrent clients")
+    parser.add_argument("--iterations", type=int, default=10, help="scenario iterations per client")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write results to this JSON file")
+    parser.add_argument("--max-p95-ms", type=float, default=None,
+                        help="fail if any endpoint (login excluded, bcrypt-bound) exceeds this p95")
+    parser.add_argument("--max-queries", type=float, default=None,
+                        help="fail if any endpoint averages more SQL queries per request")
+    parser.add_argument("--serialization", type=int, default=None, metavar="NOTES",
+                        help="only compare default vs fast note-list serialization for one user with NOTES notes")
+    parser.add_argument("--repeat", type=int, default=20, help="repetitions for --serialization")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    configure_env(database_url)
+
+    # Imported after the env is set: these modules read it at import time
+    import main as api
+    import models, schemas, security, metrics, serializers
+    from database import SessionLocal
+
+    api.send_verification_email = lambda db, to_email, token: None  # never queue mail from a benchmark
+
+    run_id = uuid.uuid4().hex[:8]
+    if args.serialization is not None:
+        emails = seed(SessionLocal, models, security, 1, args.serialization, args.tags, run_id)
+        default_ms, fast_ms, count = compare_serialization(
+            SessionLocal, models, schemas, serializers, emails[0], args.repeat)
+        print(f"{count} notes: default {default_ms:.2f} ms, fast path {fast_ms:.2f} ms "
+              f"({default_ms / fast_ms:.1f}x faster)")
+        return 0
+
+    start = time.perf_counter()
+    emails = seed(SessionLocal, models, security, args.users, args.notes, args.tags, run_id)
+    print(f"Seeded {args.users} users x {args.notes} notes x {args.tags} tags in {time.perf_counter() - start:.2f}s")
+
+    recorder, elapsed = asyncio.run(drive(api.app, emails, args.clients, args.iterations, run_id))
+    results = summarize(recorder, metrics)
+    print_report(results, elapsed)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"elapsed_seconds": elapsed, "results": results}, f, indent=2)
+
+    failures = check_thresholds(results, args.max_p95_ms, args.max_queries)
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
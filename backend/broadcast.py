@@ -0,0 +1,109 @@
+import os
+import glob
+import json
+import socket
+import tempfile
+import threading
+
+BUS_DIR = os.getenv("BROADCAST_DIR", os.path.join(tempfile.gettempdir(), "foresky-bus"))
+MAX_MESSAGE_BYTES = 64 * 1024  # stay well under the unix datagram limit
+
+
+# --------------------------
+# BUSES
+# --------------------------
+class LocalBus:
+    """
+    Topic -> handlers within this process (single worker).
+    Per-worker state (read-your-writes marks, rate-limit buckets, SSE subscribers)
+    publishes its changes here so every worker applies them.
+    """
+
+    def __init__(self):
+        self.handlers = {}  # {topic: [handler(payload)]}
+
+    def subscribe(self, topic, handler):
+        self.handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic, payload):
+        self.dispatch(topic, payload)
+
+    def dispatch(self, topic, payload):
+        for handler in self.handlers.get(topic, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"❌ Broadcast handler for '{topic}' failed: {e}")
+
+    def start(self):
+        pass
+
+
+class SocketBus(LocalBus):
+    """
+    Workers on one host (the gunicorn launcher): each binds a unix datagram socket
+    in BROADCAST_DIR and publish() sends to every other socket there. Delivery is
+    best effort: a message for a worker whose queue is full is dropped.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.path = None
+        self.sender = None
+
+    def start(self):
+        os.makedirs(BUS_DIR, exist_ok=True)
+        self.path = os.path.join(BUS_DIR, f"{os.getpid()}.sock")
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left over from a dead process with a recycled pid
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(self.path)
+        self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sender.setblocking(False)
+        threading.Thread(target=self.receive, args=(receiver,), daemon=True).start()
+        print(f"✅ Worker {os.getpid()} joined the broadcast bus in {BUS_DIR}")
+
+    def receive(self, receiver):
+        while True:
+            try:
+                message = json.loads(receiver.recv(MAX_MESSAGE_BYTES))
+            except ValueError as e:
+                print(f"❌ Bad broadcast message: {e}")
+                continue
+            self.dispatch(message["topic"], message["payload"])
+
+    def publish(self, topic, payload):
+        """Dispatch here and send to the other workers; ValueError (nothing dispatched) if too large"""
+        if self.sender is None:  # not started (e.g. scripts importing the app)
+            self.dispatch(topic, payload)
+            return
+        data = json.dumps({"topic": topic, "payload": payload}, separators=(",", ":"), default=str).encode("utf-8")
+        if len(data) > MAX_MESSAGE_BYTES:
+            raise ValueError(f"Broadcast message on '{topic}' is too large ({len(data)} bytes)")
+        self.dispatch(topic, payload)
+        for peer in glob.glob(os.path.join(BUS_DIR, "*.sock")):
+            if peer == self.path:
+                continue
+            try:
+                self.sender.sendto(data, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Nobody listening: the worker is gone
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                print(f"⚠️ Broadcast to {peer} dropped (receiver busy)")
+
+
+BUSES = {"local": LocalBus, "socket": SocketBus}
+
+
+def create_bus():
+    bus_name = os.getenv("BROADCAST_BACKEND", "local")
+    if bus_name not in BUSES:
+        raise ValueError(f"Unknown BROADCAST_BACKEND '{bus_name}' (available: {', '.join(BUSES)})")
+    return BUSES[bus_name]()
+
+
+bus = create_bus()
@@ -0,0 +1,154 @@
+import os
+import zlib
+import gzip
+import base64
+from sqlalchemy.types import TypeDecorator, String
+from fastapi.responses import JSONResponse
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+MIN_RESPONSE_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))  # smaller bodies aren't worth the CPU
+COMPRESSIBLE_TYPES = ("application/json", "text/plain")  # not text/event-stream: streams pass through
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(1024 * 1024)))
+# Note bodies of at least this many bytes are stored zlib-compressed; 0 turns it off
+NOTE_COMPRESS_MIN_BYTES = int(os.getenv("NOTE_COMPRESS_MIN_BYTES", "0"))
+
+
+# --------------------------
+# RESPONSE COMPRESSION
+# --------------------------
+def choose_encoding(accept_encoding):
+    """'br' or 'gzip' from an Accept-Encoding header (brotli preferred when installed), None for identity"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=4)  # low quality levels are close to gzip -6 in speed, and smaller
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli for JSON and plain-text responses of at least minimum_size bytes.
+    Pure ASGI (not BaseHTTPMiddleware) so other content types, like SSE streams, pass through unbuffered.
+    """
+
+    def __init__(self, app, minimum_size=MIN_RESPONSE_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        passthrough = False
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                header_map = {k.lower(): v for k, v in message["headers"]}
+                content_type = header_map.get(b"content-type", b"").decode("latin-1")
+                length = header_map.get(b"content-length")
+                passthrough = (
+                    not content_type.startswith(COMPRESSIBLE_TYPES)  # e.g. SSE streams
+                    or b"content-encoding" in header_map
+                    or (length is not None and int(length) < self.minimum_size)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            # Buffer the whole body (BaseHTTPMiddleware re-streams even plain responses in chunks)
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            response_headers = [(k, v) for k, v in start["headers"] if k.lower() != b"content-length"]
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                response_headers.append((b"content-encoding", encoding.encode()))
+                vary = [v for k, v in response_headers if k.lower() == b"vary"]
+                if not any(b"accept-encoding" in v.lower() for v in vary):
+                    response_headers.append((b"vary", b"Accept-Encoding"))
+            response_headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start, "headers": response_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+# --------------------------
+# REQUEST SIZE LIMIT
+# --------------------------
+async def request_size_middleware(request, call_next):
+    """413 before the body is read when Content-Length is over MAX_REQUEST_BYTES"""
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_REQUEST_BYTES:
+        return JSONResponse(status_code=413, content={"detail": f"Request body too large (max {MAX_REQUEST_BYTES} bytes)"})
+    return await call_next(request)
+
+
+# --------------------------
+# AT-REST COMPRESSION
+# --------------------------
+# Stored values starting with MARKER are base64(zlib(utf-8)); anything else is plain text.
+# Base64 keeps the column a plain string (no type change, old rows read as-is).
+MARKER = "\x01z:"
+
+
+class CompressedString(TypeDecorator):
+    """
+    String column that stores values of at least NOTE_COMPRESS_MIN_BYTES compressed and
+    decompresses on load, so the ORM and every query selecting the column see plain text.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        raw = value.encode("utf-8")
+        # Plain text that happens to start with MARKER is always encoded, so loading stays unambiguous
+        if (NOTE_COMPRESS_MIN_BYTES and len(raw) >= NOTE_COMPRESS_MIN_BYTES) or value.startswith(MARKER):
+            packed = base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+            if len(packed) < len(raw) or value.startswith(MARKER):
+                return MARKER + packed
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None or not value.startswith(MARKER):
+            return value
+        return zlib.decompress(base64.b64decode(value[len(MARKER):])).decode("utf-8")
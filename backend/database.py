@@ -19,18 +19,34 @@ else:
     print("❌ DATABASE_URL not set in environment!")
 
 # --- Create engine with SSL + statement cache fix for PgBouncer ---
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={
+def engine_connect_args(url):
+    if url and url.startswith("sqlite"):
+        # Local SQLite (benchmarks / dev): sessions are used from FastAPI's threadpool
+        return {"check_same_thread": False}
+    return {
         "sslmode": "require",
         "options": "-c statement_cache_size=0"   # Disable prepared statement caching (fixes PgBouncer psycopg2 bug)
-    },
-    pool_pre_ping=True  # keeps connections fresh, auto-reconnect if dropped
-)
+    }
+
+
+def create_db_engine(url):
+    return create_engine(
+        url,
+        connect_args=engine_connect_args(url),
+        pool_pre_ping=True  # keeps connections fresh, auto-reconnect if dropped
+    )
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Read replicas (optional): comma-separated URLs, used by read-only endpoints (see routing.py) ---
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+replica_engines = [create_db_engine(url) for url in REPLICA_URLS]
+ReplicaSessionLocals = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines]
+
 # Base class for models
 Base = declarative_base()
 
@@ -40,4 +56,12 @@ try:
         conn.execute(text("SELECT 1"))  # simple test query
         print("✅ Successfully connected to DB")
 except Exception as e:
-    print("❌ Database connection failed:", e)
\ No newline at end of file
+    print("❌ Database connection failed:", e)
+
+for number, replica in enumerate(replica_engines, 1):
+    try:
+        with replica.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            print(f"✅ Successfully connected to read replica {number}")
+    except Exception as e:
+        print(f"❌ Read replica {number} connection failed:", e)
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import select
+import asyncio
+import itertools
+import threading
+from datetime import datetime
+
+import broadcast
+
+
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+QUEUE_SIZE = 256  # per connection; a client that falls this far behind is told to resync
+
+# Postgres NOTIFY payloads must stay under 8000 bytes
+MAX_NOTIFY_BYTES = 7500
+
+
+def encode(event):
+    return json.dumps(event, separators=(",", ":"), default=str)
+
+
+def compact(event):
+    """The event without the item body: clients refetch it (for transports with a size limit)"""
+    data = {key: event["data"][key] for key in ("id", "version") if key in event["data"]}
+    return {**event, "data": {**data, "refetch": True}}
+
+
+def format_sse(event):
+    """One SSE frame: id + event name + JSON data"""
+    data = {key: value for key, value in event.items() if key != "id"}
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {encode(data)}\n\n"
+
+
+# --------------------------
+# BROKERS
+# --------------------------
+class MemoryBroker:
+    """
+    In-process pub/sub (the local stand-in): one asyncio.Queue per open stream.
+    Events go through the workers' broadcast bus, so a stream open on another
+    worker of this host gets them too.
+    publish() is called from the sync handlers running in the threadpool, so
+    delivery is handed to each subscriber's event loop thread-safely.
+    """
+
+    def __init__(self):
+        self.subscribers = {}  # {user_id: {queue: loop}}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        broadcast.bus.subscribe("events", lambda message: self.deliver(message["user_id"], message["event"]))
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.setdefault(user_id, {})[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self.lock:
+            queues = self.subscribers.get(user_id, {})
+            queues.pop(queue, None)
+            if not queues:
+                self.subscribers.pop(user_id, None)
+
+    def publish(self, user_id, event):
+        try:
+            broadcast.bus.publish("events", {"user_id": user_id, "event": event})
+        except ValueError:  # too big for the bus
+            broadcast.bus.publish("events", {"user_id": user_id, "event": compact(event)})
+
+    def deliver(self, user_id, event):
+        with self.lock:
+            targets = list(self.subscribers.get(user_id, {}).items())
+        for queue, loop in targets:
+            event = {**event, "id": next(self.ids)}
+            try:
+                loop.call_soon_threadsafe(offer, queue, event)
+            except RuntimeError:  # loop already closed, the stream is going away
+                pass
+
+
+def offer(queue, event):
+    if queue.full():
+        # Too far behind for incremental updates: drop the backlog, client refetches everything
+        while not queue.empty():
+            queue.get_nowait()
+        event = {"id": event["id"], "type": "resync", "data": {}}
+    queue.put_nowait(event)
+
+
+class PostgresBroker(MemoryBroker):
+    """
+    Fans events out across processes/instances with LISTEN/NOTIFY: publish() sends pg_notify,
+    and a listener thread per process delivers what it receives to its local subscribers.
+    LISTEN needs a session connection, so point EVENTS_DATABASE_URL at the database directly
+    when DATABASE_URL goes through PgBouncer in transaction mode.
+    """
+
+    CHANNEL = "foresky_events"
+
+    def __init__(self):
+        super().__init__()
+        from database import engine, create_db_engine
+
+        url = os.getenv("EVENTS_DATABASE_URL")
+        self.engine = create_db_engine(url) if url else engine
+        self.listener = None
+
+    def subscribe(self, user_id):
+        # Only processes with open streams need to listen
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, daemon=True)
+                self.listener.start()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id, event):
+        from sqlalchemy import text
+
+        payload = encode({"user_id": user_id, **event})
+        if len(payload.encode("utf-8")) > MAX_NOTIFY_BYTES:
+            payload = encode({"user_id": user_id, **compact(event)})
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": self.CHANNEL, "payload": payload})
+        except Exception as e:
+            print(f"❌ Event publish failed: {e}")
+
+    def listen(self):
+        while True:
+            try:
+                conn = self.engine.raw_connection()
+                try:
+                    conn.driver_connection.autocommit = True
+                    cursor = conn.driver_connection.cursor()
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+                    print(f"✅ Listening for events on '{self.CHANNEL}'")
+                    while True:
+                        if select.select([conn.driver_connection], [], [], HEARTBEAT_SECONDS) == ([], [], []):
+                            continue
+                        conn.driver_connection.poll()
+                        while conn.driver_connection.notifies:
+                            notify = conn.driver_connection.notifies.pop(0)
+                            message = json.loads(notify.payload)
+                            user_id = message.pop("user_id")
+                            self.deliver(user_id, message)
+                finally:
+                    conn.invalidate()
+            except Exception as e:
+                print(f"❌ Event listener error, reconnecting: {e}")
+                time.sleep(5)
+
+
+BROKERS = {"memory": MemoryBroker, "postgres": PostgresBroker}
+
+
+def create_broker():
+    broker_name = os.getenv("EVENTS_BACKEND", "memory")
+    if broker_name not in BROKERS:
+        raise ValueError(f"Unknown EVENTS_BACKEND '{broker_name}' (available: {', '.join(BROKERS)})")
+    return BROKERS[broker_name]()
+
+
+broker = create_broker()
+
+
+# --------------------------
+# PUBLISH / STREAM
+# --------------------------
+def publish(user_id, event_type, data):
+    """Tell the user's open streams about a change (call after the commit)"""
+    broker.publish(user_id, {"type": event_type, "data": data, "at": datetime.utcnow().isoformat()})
+
+
+async def stream(user_id, is_disconnected):
+    """SSE frames for one connection until the client goes away"""
+    queue = broker.subscribe(user_id)
+    try:
+        # retry: reconnect delay for EventSource; 'ready' tells a reconnecting client to refetch once
+        yield f"retry: 3000\nevent: ready\ndata: {{}}\n\n"
+        while not await is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"  # also keeps proxies from closing an idle stream
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(user_id, queue)
@@ -0,0 +1,51 @@
+"""
+Production launcher:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Uvicorn workers, one per core by default (WEB_CONCURRENCY overrides it).
+Workers share state through the broadcast bus (broadcast.py) and singleton jobs
+run in a single elected worker (leader.py); both use local stand-ins by default.
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Each worker imports the app itself: engines and their pools must not be shared across a fork
+preload_app = False
+
+timeout = 60               # a worker not heartbeating for this long is restarted
+graceful_timeout = 30
+keepalive = 5              # Render's proxy reuses connections
+max_requests = 5000        # recycle workers now and then
+max_requests_jitter = 500  # ...not all at once
+
+accesslog = "-"
+# %(U)s: path without the query string (the event stream's token is in it); uvicorn's own access lines are filtered in main.py
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = "-"
+
+# Several workers: per-worker state must be broadcast between them
+os.environ.setdefault("BROADCAST_BACKEND", "socket" if workers > 1 else "local")
+
+
+def on_starting(server):
+    import sys
+    import glob
+    import tempfile
+    import subprocess
+
+    # Workers starting together would race on main.py's create_all: create the tables once, first.
+    # In a subprocess, so the master never holds DB connections its forked workers would inherit.
+    subprocess.run(
+        [sys.executable, "-c", "import models; from database import Base, engine; Base.metadata.create_all(bind=engine)"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+    )
+
+    # Sockets left by a previous run's workers would only collect undeliverable messages
+    bus_dir = os.getenv("BROADCAST_DIR", os.path.join(tempfile.gettempdir(), "foresky-bus"))
+    for path in glob.glob(os.path.join(bus_dir, "*.sock")):
+        os.remove(path)
@@ -0,0 +1,130 @@
+import os
+import zlib
+import asyncio
+import tempfile
+
+RETRY_SECONDS = float(os.getenv("LEADER_RETRY_SECONDS", "15"))
+LOCK_DIR = os.getenv("LEADER_LOCK_DIR", os.path.join(tempfile.gettempdir(), "foresky-locks"))
+
+
+# --------------------------
+# LOCKS
+# --------------------------
+class FileLock:
+    """
+    flock() on a file in LEADER_LOCK_DIR (the local stand-in): one leader per host.
+    The OS releases it when the holder exits, so a crashed leader is replaced on the next retry.
+    """
+
+    def __init__(self, name):
+        self.path = os.path.join(LOCK_DIR, f"{name}.lock")
+        self.file = None
+
+    def try_acquire(self):
+        import fcntl
+
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self.file = lock_file
+        return True
+
+    def still_held(self):
+        return True
+
+    def release(self):
+        if self.file is not None:
+            self.file.close()  # closing drops the flock
+            self.file = None
+
+
+class PostgresAdvisoryLock:
+    """
+    pg_try_advisory_lock on a dedicated connection: one leader across all hosts.
+    Session locks need a real session, so set LEADER_DATABASE_URL to a direct (non-PgBouncer) URL.
+    """
+
+    def __init__(self, name):
+        from database import engine, create_db_engine
+
+        url = os.getenv("LEADER_DATABASE_URL")
+        self.engine = create_db_engine(url) if url else engine
+        self.key = zlib.crc32(f"foresky:{name}".encode())
+        self.conn = None
+
+    def try_acquire(self):
+        conn = self.engine.raw_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+        acquired = cursor.fetchone()[0]
+        conn.commit()
+        if not acquired:
+            conn.close()
+            return False
+        self.conn = conn
+        return True
+
+    def still_held(self):
+        # The lock lives as long as the connection does
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            self.conn.commit()
+            return True
+        except Exception:
+            self.release()
+            return False
+
+    def release(self):
+        if self.conn is not None:
+            self.conn.invalidate()  # never hand a lock-holding connection back to the pool
+            self.conn = None
+
+
+LOCKS = {"file": FileLock, "postgres": PostgresAdvisoryLock}
+
+
+def create_lock(name):
+    lock_name = os.getenv("LEADER_LOCK", "file")
+    if lock_name not in LOCKS:
+        raise ValueError(f"Unknown LEADER_LOCK '{lock_name}' (available: {', '.join(LOCKS)})")
+    return LOCKS[lock_name](name)
+
+
+# --------------------------
+# RUNNER
+# --------------------------
+async def run_as_leader(name, job):
+    """
+    Singleton background jobs (keep-alive, mail dispatch) with several workers: every worker calls this,
+    only the one holding name's lock runs the job coroutine (restarted if it crashes).
+    """
+    lock = create_lock(name)
+    while True:
+        try:
+            acquired = await asyncio.to_thread(lock.try_acquire)
+        except Exception as e:
+            print(f"❌ Leader election for '{name}' failed: {e}")
+            acquired = False
+        if not acquired:
+            await asyncio.sleep(RETRY_SECONDS)
+            continue
+
+        print(f"👑 Worker {os.getpid()} is the leader for '{name}'")
+        task = asyncio.create_task(job())
+        try:
+            while await asyncio.to_thread(lock.still_held):
+                done, _ = await asyncio.wait({task}, timeout=RETRY_SECONDS)
+                if done:
+                    print(f"❌ '{name}' stopped: {task.exception()!r}, restarting")
+                    await asyncio.sleep(RETRY_SECONDS)
+                    task = asyncio.create_task(job())
+            print(f"⚠️ Worker {os.getpid()} lost leadership for '{name}'")
+        finally:
+            task.cancel()
+            lock.release()
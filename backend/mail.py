@@ -0,0 +1,74 @@
+import os
+import asyncio
+import smtplib
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+
+import models
+from database import SessionLocal
+
+DISPATCH_SECONDS = float(os.getenv("MAIL_DISPATCH_SECONDS", "2"))
+MAX_ATTEMPTS = 5
+BATCH_SIZE = 20
+
+
+# --------------------------
+# OUTBOX
+# --------------------------
+def queue_email(db, to_email, subject, body):
+    """Add a message to the outbox (the caller commits, so it goes out only if the transaction does)"""
+    db.add(models.OutboxEmail(to_email=to_email, subject=subject, body=body))
+
+
+def smtp_send(to_email, subject, body):
+    """Sends an email via Gmail SMTP (raises on failure)"""
+    msg = MIMEText(body)
+    msg["Subject"] = subject
+    msg["From"] = os.getenv("EMAIL_FROM")
+    msg["To"] = to_email
+
+    with smtplib.SMTP(os.getenv("EMAIL_HOST"), int(os.getenv("EMAIL_PORT"))) as server:
+        server.starttls()  # upgrade to secure connection
+        server.login(os.getenv("EMAIL_HOST_USER"), os.getenv("EMAIL_HOST_PASSWORD"))
+        server.send_message(msg)
+
+
+# --------------------------
+# DISPATCH (leader only, see leader.py)
+# --------------------------
+def dispatch_pending():
+    """Send one batch of due messages; failures are retried with exponential backoff, MAX_ATTEMPTS times"""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        pending = db.query(models.OutboxEmail).filter(
+            models.OutboxEmail.sent_at.is_(None),
+            models.OutboxEmail.attempts < MAX_ATTEMPTS,
+            models.OutboxEmail.next_attempt_at <= now
+        ).order_by(models.OutboxEmail.id).limit(BATCH_SIZE).all()
+
+        for message in pending:
+            message.attempts += 1
+            try:
+                smtp_send(message.to_email, message.subject, message.body)
+                message.sent_at = datetime.utcnow()
+                print(f"✅ Email '{message.subject}' sent to {message.to_email}")
+            except Exception as e:
+                message.last_error = str(e)[:500]
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=30 * 2 ** message.attempts)
+                print(f"❌ Email sending failed (attempt {message.attempts}/{MAX_ATTEMPTS}): {e}")
+            db.commit()  # per message: a crash mid-batch doesn't resend what already went out
+        return len(pending)
+    finally:
+        db.close()
+
+
+async def dispatch_loop():
+    while True:
+        try:
+            sent = await asyncio.to_thread(dispatch_pending)
+        except Exception as e:
+            print(f"❌ Mail dispatch error: {e}")
+            sent = 0
+        if sent < BATCH_SIZE:
+            await asyncio.sleep(DISPATCH_SECONDS)
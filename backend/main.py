@@ -1,17 +1,20 @@
 import os
-import smtplib
-from email.mime.text import MIMEText
-from fastapi import Depends, FastAPI, HTTPException, status, Body, Path, BackgroundTasks
+import logging
+from fastapi import Depends, FastAPI, HTTPException, status, Body, Path, Query, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import text  # Added this import
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import text, update  # Added this import
+from typing import List, Optional
 import asyncio
 from datetime import datetime
 
-import models, schemas, security
-from database import SessionLocal, engine, Base
+import models, schemas, security, metrics, ratelimit, serializers, revisions, events, sync, routing, compression
+import broadcast, leader, mail, verification
+from database import SessionLocal, engine, replica_engines, Base
 
 # Create DB tables
 Base.metadata.create_all(bind=engine)
@@ -19,7 +22,42 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(title="ForeSky API", description="FastAPI backend for ForeSky", version="1.0")
 
 # --------------------------
-# CORS
+# ACCESS LOG (paths without query strings: the event stream's token travels in one)
+# --------------------------
+class StripQueryString(logging.Filter):
+    def filter(self, record):
+        # uvicorn.access args: (client, method, path with query, http version, status)
+        if isinstance(record.args, tuple) and len(record.args) == 5:
+            record.args = (*record.args[:2], str(record.args[2]).split("?", 1)[0], *record.args[3:])
+        return True
+
+logging.getLogger("uvicorn.access").addFilter(StripQueryString())
+
+
+# --------------------------
+# METRICS (latency + SQL per route)
+# --------------------------
+metrics.instrument_engine(engine)
+for replica_engine in replica_engines:
+    metrics.instrument_engine(replica_engine)
+app.middleware("http")(metrics.metrics_middleware)
+
+
+# --------------------------
+# READ REPLICA ROUTING (read-your-writes after a mutation)
+# --------------------------
+app.middleware("http")(routing.routing_middleware)
+
+
+# --------------------------
+# COMPRESSION & REQUEST SIZE LIMIT
+# --------------------------
+app.middleware("http")(compression.request_size_middleware)
+app.add_middleware(compression.CompressionMiddleware)
+
+
+# --------------------------
+# CORS (registered last: outermost, so responses from the middleware above get its headers too, e.g. 413)
 # --------------------------
 origins = [
     "http://localhost:5173",                 # Local dev
@@ -46,15 +84,24 @@ async def keep_alive_task():
             # Ping database to keep connection alive
             db = SessionLocal()
             db.execute(text("SELECT 1"))  # Fixed: using text()
+            purged = sync.purge_tombstones(db)
+            purged_tokens = verification.purge_tokens(db)
             db.close()
-            print(f"Keep-alive ping at {datetime.now()}")
+            print(f"Keep-alive ping at {datetime.now()}"
+                  + (f" (purged {purged} deleted note(s))" if purged else "")
+                  + (f" (purged {purged_tokens} used/expired verification token(s))" if purged_tokens else ""))
         except Exception as e:
             print(f"Keep-alive error: {e}")
 
 @app.on_event("startup")
 async def startup_event():
-    """Start background keep-alive task on server startup"""
-    asyncio.create_task(keep_alive_task())
+    """
+    Join the workers' broadcast bus and start the singleton background jobs
+    (each runs only in the worker holding its leader lock, see leader.py)
+    """
+    broadcast.bus.start()
+    asyncio.create_task(leader.run_as_leader("keep_alive", keep_alive_task))
+    asyncio.create_task(leader.run_as_leader("mail_dispatch", mail.dispatch_loop))
 
 
 # --------------------------
@@ -72,9 +119,29 @@ def get_db():
 # OAuth2 Scheme
 # --------------------------
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+    return user_from_token(db, token)
+
+
+def get_read_db(token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """Session for read-only endpoints: a replica, unless this user wrote in the last few seconds"""
+    db = routing.open_read_session(security.token_subject(token) if token else None)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_current_reader(db: Session = Depends(get_read_db), token: str = Depends(oauth2_scheme)):
+    """get_current_user for read-only endpoints (same session as get_read_db)"""
+    return user_from_token(db, token)
+
+
+def user_from_token(db: Session, token: str, purpose: Optional[str] = None):
+    """The token's user; purpose-bound tokens (verification links, event streams) only where purpose asks for them"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials. Please log in again.",
@@ -83,7 +150,7 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     try:
         payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("purpose") != purpose:
             raise credentials_exception
         token_data = schemas.TokenData(email=email)
     except security.jwt.ExpiredSignatureError:
@@ -104,9 +171,9 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
 # --------------------------
 # EMAIL SENDING UTILITY
 # --------------------------
-def send_verification_email(to_email: str, token: str):
+def send_verification_email(db: Session, to_email: str, token: str):
     """
-    Sends an email via Gmail SMTP with a verification link.
+    Queues an email with a verification link (sent by the mail dispatcher once the caller commits).
     """
     verify_link = f"{os.getenv('FRONTEND_URL')}/verify?token={token}"
     body = f"""
@@ -119,19 +186,7 @@ def send_verification_email(to_email: str, token: str):
     This link is valid for 24 hours.
     """
 
-    msg = MIMEText(body)
-    msg["Subject"] = "Verify your ForeSky account"
-    msg["From"] = os.getenv("EMAIL_FROM")
-    msg["To"] = to_email
-
-    try:
-        with smtplib.SMTP(os.getenv("EMAIL_HOST"), int(os.getenv("EMAIL_PORT"))) as server:
-            server.starttls()  # upgrade to secure connection
-            server.login(os.getenv("EMAIL_HOST_USER"), os.getenv("EMAIL_HOST_PASSWORD"))
-            server.send_message(msg)
-            print(f"✅ Verification email sent to {to_email}")
-    except Exception as e:
-        print(f"❌ Email sending failed: {e}")
+    mail.queue_email(db, to_email, "Verify your ForeSky account", body)
 
 
 # --------------------------
@@ -158,10 +213,17 @@ def ping():
     return {"pong": True, "time": datetime.now()}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint: per-route latency, SQL counts/time and slow queries"""
+    return PlainTextResponse(metrics.render_latest(), media_type="text/plain; version=0.0.4")
+
+
 # --------------------------
 # AUTH ENDPOINTS
 # --------------------------
-@app.post("/auth/register", response_model=schemas.User)
+@app.post("/auth/register", response_model=schemas.UserProfile,
+          dependencies=[Depends(ratelimit.limit_by_ip(ratelimit.register_ip_limiter))])
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
     if db_user:
@@ -170,49 +232,74 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     hashed_password = security.get_password_hash(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password, is_active=True, is_verified=False)
     db.add(db_user)
+    db.flush()  # assigns db_user.id for the token record
+    token = verification.issue_token(db, db_user)
+    send_verification_email(db, user.email, token)  # same transaction as the user
     db.commit()
     db.refresh(db_user)
 
-    token = security.create_email_token(user.email)
-    send_verification_email(user.email, token)
-
     return db_user
 
 
-@app.post("/auth/resend")
+@app.post("/auth/resend", dependencies=[Depends(ratelimit.limit_by_ip(ratelimit.resend_ip_limiter))])
 def resend_verification(
     email: str = Body(..., embed=True),
     db: Session = Depends(get_db)
 ):
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    if user.is_verified:
-        return {"message": "User is already verified. Please log in."}
+    key = ratelimit.email_key(email)
+
+    def resend():
+        ratelimit.resend_email_limiter.check(key)
+        user = db.query(models.User).filter(models.User.email == email).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        if user.is_verified:
+            return {"message": "User is already verified. Please log in."}
 
-    # generate new token and resend
-    token = security.create_email_token(user.email)
-    send_verification_email(user.email, token)
-    return {"message": f"Verification email resent to {email}"}
+        # generate new token (the previous link stops working) and resend
+        token = verification.issue_token(db, user)
+        send_verification_email(db, user.email, token)
+        db.commit()
+        return {"message": f"Verification email resent to {email}"}
+
+    # Concurrent resends for the same address share one lookup + one email
+    return ratelimit.resend_coalescer.run(key, resend)
 
 
 @app.get("/auth/verify")
 def verify_email(token: str, db: Session = Depends(get_db)):
-    email = security.verify_email_token(token)
-    if email is None:
+    decoded = security.verify_email_token(token)
+    if decoded is None:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
+    email, jti = decoded
+    verified = {"message": "Email verified successfully. You can now log in."}
 
     user = db.query(models.User).filter(models.User.email == email).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # Idempotent fast path: repeated clicks and link-scanner prefetches are a read, not a write
+    if user.is_verified:
+        return verified
+
+    # Links issued before single-use tokens carry no jti; they only work until security.LEGACY_EMAIL_TOKENS_UNTIL (if set)
+    if jti is not None and not verification.consume_token(db, jti, user.id):
+        db.rollback()
+        db.refresh(user)
+        if user.is_verified:  # a concurrent click on the same link won
+            return verified
+        raise HTTPException(status_code=400, detail="This link was already used or replaced by a newer one")
+
     user.is_verified = True
     db.commit()
-    return {"message": "Email verified successfully. You can now log in."}
+    return verified
 
 
-@app.post("/auth/login", response_model=schemas.Token)
+@app.post("/auth/login", response_model=schemas.Token,
+          dependencies=[Depends(ratelimit.limit_by_ip(ratelimit.login_ip_limiter))])
 def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # Checked before any bcrypt work
+    ratelimit.login_email_limiter.check(ratelimit.email_key(form_data.username))
     user = db.query(models.User).filter(models.User.email == form_data.username).first()
     if not user or not security.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
@@ -248,21 +335,30 @@ def refresh_token(current_user: schemas.User = Depends(get_current_user)):
 def create_tag(
     tag: schemas.TagBase, 
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)  # Added auth
+    current_user: models.User = Depends(get_current_user)  # Added auth
 ):
-    db_tag = db.query(models.Tag).filter(models.Tag.name == tag.name).first()
+    # Tags are per user: lookups go through the (owner_id, name) index
+    tag_query = db.query(models.Tag).filter(models.Tag.owner_id == current_user.id, models.Tag.name == tag.name)
+    db_tag = tag_query.first()
     if db_tag:
         return db_tag
-    new_tag = models.Tag(name=tag.name)
+    new_tag = models.Tag(name=tag.name, owner_id=current_user.id)
     db.add(new_tag)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Same tag created concurrently (e.g. from another tab): return that one
+        db.rollback()
+        return tag_query.first()
     db.refresh(new_tag)
+    events.publish(current_user.id, "tag.created", serializers.tag_row(new_tag))
     return new_tag
 
 
-@app.get("/tags/", response_model=List[schemas.Tag])
-def get_tags(db: Session = Depends(get_db)):
-    return db.query(models.Tag).all()
+@app.get("/tags/", response_model=List[schemas.Tag], response_class=ORJSONResponse)
+def get_tags(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_reader)):
+    tags = db.query(models.Tag).filter(models.Tag.owner_id == current_user.id).order_by(models.Tag.id)
+    return ORJSONResponse(serializers.tag_rows(tags))
 
 
 @app.put("/tags/{tag_id}", response_model=schemas.Tag)
@@ -270,15 +366,19 @@ def update_tag(
     tag_id: int = Path(...),
     tag_update: schemas.TagBase = Body(...),
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_current_user)
 ):
     """Update a tag's name - this will affect all notes using this tag"""
-    db_tag = db.query(models.Tag).filter(models.Tag.id == tag_id).first()
+    db_tag = db.query(models.Tag).filter(
+        models.Tag.id == tag_id,
+        models.Tag.owner_id == current_user.id
+    ).first()
     if not db_tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     
-    # Check if new name already exists
+    # Check if new name already exists (among this user's tags)
     existing = db.query(models.Tag).filter(
+        models.Tag.owner_id == current_user.id,
         models.Tag.name == tag_update.name,
         models.Tag.id != tag_id
     ).first()
@@ -288,6 +388,7 @@ def update_tag(
     db_tag.name = tag_update.name
     db.commit()
     db.refresh(db_tag)
+    events.publish(current_user.id, "tag.updated", serializers.tag_row(db_tag))
     return db_tag
 
 
@@ -295,10 +396,13 @@ def update_tag(
 def delete_tag(
     tag_id: int = Path(...),
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_current_user)
 ):
     """Delete a tag only if no notes are using it"""
-    db_tag = db.query(models.Tag).filter(models.Tag.id == tag_id).first()
+    db_tag = db.query(models.Tag).filter(
+        models.Tag.id == tag_id,
+        models.Tag.owner_id == current_user.id
+    ).first()
     if not db_tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     
@@ -315,20 +419,64 @@ def delete_tag(
     
     db.delete(db_tag)
     db.commit()
+    events.publish(current_user.id, "tag.deleted", {"id": tag_id})
     return {"message": "Tag deleted successfully"}
 
 
 # --------------------------
 # USER ENDPOINTS
 # --------------------------
-@app.get("/users/me/", response_model=schemas.User)
-def read_users_me(current_user: schemas.User = Depends(get_current_user)):
-    return current_user
+@app.get("/users/me/", response_model=schemas.UserWithNotes, response_class=ORJSONResponse)
+def read_users_me(
+    include: Optional[str] = Query(None, description="Comma-separated expansions; only 'notes' is supported"),
+    notes_limit: int = Query(50, ge=1, le=500),
+    notes_offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_reader)
+):
+    """Lean profile by default; ?include=notes adds one page of notes (notes_limit/notes_offset)"""
+    expansions = {part.strip() for part in include.split(",") if part.strip()} if include else set()
+    unsupported = expansions - {"notes"}
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported include: {', '.join(sorted(unsupported))}")
+
+    profile = schemas.UserProfile.model_validate(current_user).model_dump()
+    if "notes" in expansions:
+        profile["notes"] = serializers.note_rows(db, current_user.id, limit=notes_limit, offset=notes_offset)
+        profile["notes_total"] = db.query(models.Note).filter(
+            models.Note.owner_id == current_user.id,
+            models.Note.deleted_at.is_(None)
+        ).count()
+    return ORJSONResponse(profile)
 
 
 # --------------------------
 # NOTES ENDPOINTS
 # --------------------------
+def get_own_note(note_id: int, db: Session, current_user: models.User, for_update: bool = False):
+    query = db.query(models.Note).filter(
+        models.Note.id == note_id,
+        models.Note.owner_id == current_user.id,
+        models.Note.deleted_at.is_(None)  # tombstones (see sync.py) are gone for everything but /users/me/sync
+    )
+    if for_update:
+        # Writes recording a revision: concurrent ones wait here instead of racing for the next revision number
+        query = query.with_for_update()
+    db_note = query.first()
+    if not db_note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return db_note
+
+
+def commit_note_write(db: Session, note_id: int):
+    """Commit a write that recorded a revision; 409 if a concurrent one took the same revision number"""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise note_conflict(db.query(models.Note.version).filter(models.Note.id == note_id).scalar())
+
+
 @app.post("/users/me/notes/", response_model=schemas.Note)
 def create_note_for_user(
     note: schemas.NoteCreate, 
@@ -339,18 +487,24 @@ def create_note_for_user(
     
     # Handle tags if provided
     if note.tag_ids:
-        db_note.tags = db.query(models.Tag).filter(models.Tag.id.in_(note.tag_ids)).all()
+        db_note.tags = db.query(models.Tag).filter(
+            models.Tag.id.in_(note.tag_ids),
+            models.Tag.owner_id == current_user.id  # only the user's own tags can be attached
+        ).all()
     
     db.add(db_note)
+    db.flush()  # assigns db_note.id for the first revision
+    revisions.record_revision(db, db_note)
     db.commit()
     db.refresh(db_note)
+    events.publish(current_user.id, "note.created", serializers.note_to_row(db_note))
     return db_note
 
 
-@app.get("/users/me/notes/", response_model=List[schemas.Note])
-def read_own_notes(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    notes = db.query(models.Note).filter(models.Note.owner_id == current_user.id).all()
-    return notes
+@app.get("/users/me/notes/", response_model=List[schemas.Note], response_class=ORJSONResponse)
+def read_own_notes(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_reader)):
+    # Fast path: rows built from column tuples and encoded with orjson, skipping per-note ORM -> model validation
+    return ORJSONResponse(serializers.note_rows(db, current_user.id))
 
 
 @app.put("/users/me/notes/{note_id}", response_model=schemas.Note)
@@ -360,13 +514,9 @@ def update_note(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    db_note = db.query(models.Note).filter(
-        models.Note.id == note_id,
-        models.Note.owner_id == current_user.id
-    ).first()
+    db_note = get_own_note(note_id, db, current_user, for_update=True)
 
-    if not db_note:
-        raise HTTPException(status_code=404, detail="Note not found")
+    previous_state = revisions.note_state(db_note)
 
     # Update basic fields
     db_note.title = note.title
@@ -374,43 +524,281 @@ def update_note(
     
     # Update tags if provided
     if note.tag_ids is not None:
-        db_note.tags = db.query(models.Tag).filter(models.Tag.id.in_(note.tag_ids)).all()
+        db_note.tags = db.query(models.Tag).filter(
+            models.Tag.id.in_(note.tag_ids),
+            models.Tag.owner_id == current_user.id  # only the user's own tags can be attached
+        ).all()
     
-    db.commit()
+    changed = revisions.record_revision(db, db_note, previous_state)
+    if changed:
+        db_note.version = models.Note.version + 1  # full replace: last writer wins, but PATCHes from older versions now conflict
+    commit_note_write(db, note_id)
     db.refresh(db_note)
+    if changed:
+        events.publish(current_user.id, "note.updated", serializers.note_to_row(db_note))
     return db_note
 
 
-@app.delete("/users/me/notes/{note_id}")
-def delete_note(
+def note_conflict(current_version: int):
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Note was modified elsewhere (current version {current_version}). Reload it and try again.",
+    )
+
+
+@app.patch("/users/me/notes/{note_id}", response_model=schemas.Note)
+def patch_note(
     note_id: int = Path(...),
+    patch: schemas.NotePatch = Body(...),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    db_note = db.query(models.Note).filter(
-        models.Note.id == note_id,
-        models.Note.owner_id == current_user.id
-    ).first()
+    """
+    Partial update with optimistic concurrency: only the fields sent are written,
+    and only if the note is still at patch.version (409 otherwise).
+    Tags are diffed so only the changed note_tags rows are inserted/deleted.
+    """
+    db_note = get_own_note(note_id, db, current_user, for_update=True)
+    if db_note.version != patch.version:
+        raise note_conflict(db_note.version)
+
+    sent = patch.model_fields_set
+    if "title" in sent and patch.title is None:
+        raise HTTPException(status_code=400, detail="Title cannot be empty")
+
+    previous_state = revisions.note_state(db_note)
+    tags = {tag.id: tag.name for tag in db_note.tags}
+    changes = {
+        field: getattr(patch, field) for field in ("title", "content")
+        if field in sent and getattr(patch, field) != getattr(db_note, field)
+    }
 
-    if not db_note:
-        raise HTTPException(status_code=404, detail="Note not found")
+    to_add, to_remove = set(), set()
+    if "tag_ids" in sent:
+        requested = set(patch.tag_ids or [])
+        to_remove = set(tags) - requested
+        to_add = requested - set(tags)
+        if to_add:
+            # only the user's own tags can be attached
+            owned = db.query(models.Tag.id, models.Tag.name).filter(
+                models.Tag.id.in_(to_add),
+                models.Tag.owner_id == current_user.id
+            ).all()
+            to_add = {tag_id for tag_id, _ in owned}
+            tags.update(owned)
+        for tag_id in to_remove:
+            del tags[tag_id]
+
+    if not changes and not to_add and not to_remove:
+        return serializers.note_row(db_note.id, db_note.title, db_note.content,
+                                    serializers.tag_dicts(tags), db_note.version)
+
+    # Compare-and-swap: a concurrent write since our read bumps the version and matches 0 rows
+    result = db.execute(
+        update(models.Note)
+        .where(models.Note.id == note_id, models.Note.version == patch.version)
+        .values(**changes, version=patch.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise note_conflict(db.query(models.Note.version).filter(models.Note.id == note_id).scalar())
+
+    if to_remove:
+        db.execute(models.note_tags.delete().where(
+            models.note_tags.c.note_id == note_id,
+            models.note_tags.c.tag_id.in_(to_remove)
+        ))
+    if to_add:
+        db.execute(models.note_tags.insert(), [{"note_id": note_id, "tag_id": tag_id} for tag_id in to_add])
+
+    state = {**previous_state, **changes, "tag_ids": sorted(tags)}
+    revisions.record_revision(db, db_note, previous_state, state=state)
+    commit_note_write(db, note_id)
+    row = serializers.note_row(note_id, state["title"], state["content"], serializers.tag_dicts(tags), patch.version + 1)
+    events.publish(current_user.id, "note.updated", row)
+    return row
 
-    db.delete(db_note)
+
+@app.delete("/users/me/notes/{note_id}")
+def delete_note(
+    note_id: int = Path(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    db_note = get_own_note(note_id, db, current_user)
+
+    # Tombstone instead of a hard delete, so syncing clients learn about it
+    now = datetime.utcnow()
+    db_note.title = None
+    db_note.content = None
+    db_note.tags = []
+    db_note.revisions = []
+    db_note.version = models.Note.version + 1
+    db_note.deleted_at = now
+    db_note.updated_at = now
     db.commit()
+    events.publish(current_user.id, "note.deleted", {"id": note_id})
     return {"message": "Note deleted successfully"}
 
 
+# --------------------------
+# NOTE REVISIONS
+# --------------------------
+def get_revision_state(db: Session, note_id: int, number: int):
+    state = revisions.load_state(db, note_id, number)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return state
+
+
+@app.get("/users/me/notes/{note_id}/revisions", response_model=List[schemas.NoteRevisionInfo])
+def list_note_revisions(
+    note_id: int = Path(...),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_reader)
+):
+    """Revision metadata only (no content decoding), newest first"""
+    get_own_note(note_id, db, current_user)
+    return db.query(
+        models.NoteRevision.number, models.NoteRevision.is_snapshot, models.NoteRevision.created_at
+    ).filter(models.NoteRevision.note_id == note_id).order_by(models.NoteRevision.number.desc()).all()
+
+
+@app.get("/users/me/notes/{note_id}/revisions/{number}", response_model=schemas.NoteRevision)
+def read_note_revision(
+    note_id: int = Path(...),
+    number: int = Path(...),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_reader)
+):
+    get_own_note(note_id, db, current_user)
+    return {"number": number, **get_revision_state(db, note_id, number)}
+
+
+@app.get("/users/me/notes/{note_id}/revisions/{number}/diff", response_model=schemas.NoteRevisionDiff)
+def diff_note_revision(
+    note_id: int = Path(...),
+    number: int = Path(...),
+    against: Optional[int] = Query(None, description="Revision to compare with (default: the previous one)"),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_reader)
+):
+    get_own_note(note_id, db, current_user)
+    against = number - 1 if against is None else against
+    old = get_revision_state(db, note_id, against)
+    new = get_revision_state(db, note_id, number)
+    return {"from_number": against, "to_number": number, "diff": revisions.diff_states(old, new, against, number)}
+
+
+@app.post("/users/me/notes/{note_id}/revisions/{number}/restore", response_model=schemas.Note)
+def restore_note_revision(
+    note_id: int = Path(...),
+    number: int = Path(...),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Bring a note back to an earlier revision (recorded as a new revision)"""
+    db_note = get_own_note(note_id, db, current_user, for_update=True)
+    state = get_revision_state(db, note_id, number)
+    previous_state = revisions.note_state(db_note)
+
+    db_note.title = state["title"]
+    db_note.content = state["content"]
+    # Tags deleted since then are simply not re-attached
+    db_note.tags = db.query(models.Tag).filter(
+        models.Tag.id.in_(state["tag_ids"]),
+        models.Tag.owner_id == current_user.id
+    ).all()
+
+    changed = revisions.record_revision(db, db_note, previous_state)
+    if changed:
+        db_note.version = models.Note.version + 1
+    commit_note_write(db, note_id)
+    db.refresh(db_note)
+    if changed:
+        events.publish(current_user.id, "note.updated", serializers.note_to_row(db_note))
+    return db_note
+
+
+# --------------------------
+# DELTA SYNC
+# --------------------------
+@app.get("/users/me/sync", response_model=schemas.SyncChanges, response_class=ORJSONResponse)
+def sync_changes(
+    since: Optional[str] = Query(None, description="'next' token from the previous sync; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Notes created, changed or deleted since the token (everything when full is true: replace local data).
+    Keep calling with next while has_more, then store next for the following sync.
+    """
+    # Stays on the primary: a lagging replica would hand out a token past writes it hasn't applied yet
+    cursor = None
+    if since:
+        cursor = sync.decode_token(since)
+        if cursor is None:
+            raise HTTPException(status_code=400, detail="Invalid sync token")
+    return ORJSONResponse(sync.changes(db, current_user.id, cursor, limit))
+
+
+# --------------------------
+# LIVE EVENTS (SSE)
+# --------------------------
+@app.post("/users/me/events/token")
+def create_events_token(current_user: models.User = Depends(get_current_user)):
+    """Short-lived token for opening the event stream (EventSource can't send an Authorization header)"""
+    return {"token": security.create_events_token(current_user.email), "expires_in": security.EVENTS_TOKEN_SECONDS}
+
+
+@app.get("/users/me/events")
+async def stream_events(
+    request: Request,
+    token: Optional[str] = Query(None, description="Token from POST /users/me/events/token (not the access token)"),
+    bearer: Optional[str] = Depends(optional_oauth2_scheme)
+):
+    """
+    Server-sent events for the current user's note/tag changes:
+    note.created / note.updated (full note), note.deleted (id), tag.created / tag.updated / tag.deleted,
+    and resync when the client fell behind. A ': keep-alive' comment is sent every 15s.
+    """
+    def authenticate():
+        # Short-lived session: a stream can stay open for hours and must not hold a pooled connection
+        db = SessionLocal()
+        try:
+            if bearer:
+                return user_from_token(db, bearer).id
+            return user_from_token(db, token, purpose=security.EVENTS_TOKEN_PURPOSE).id
+        finally:
+            db.close()
+
+    if not (bearer or token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    user_id = await run_in_threadpool(authenticate)
+    return StreamingResponse(
+        events.stream(user_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # no proxy buffering of the stream
+    )
+
+
 # --------------------------
 # STATS ENDPOINT
 # --------------------------
 @app.get("/users/me/stats")
 def get_user_stats(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_reader)
 ):
     """Get user statistics"""
-    notes_count = db.query(models.Note).filter(models.Note.owner_id == current_user.id).count()
-    tags_count = db.query(models.Tag).count()
+    notes_count = db.query(models.Note).filter(
+        models.Note.owner_id == current_user.id,
+        models.Note.deleted_at.is_(None)
+    ).count()
+    tags_count = db.query(models.Tag).filter(models.Tag.owner_id == current_user.id).count()
     
     return {
         "notes_count": notes_count,
@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# --------------------------
+# CONFIG
+# --------------------------
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# --------------------------
+# METRIC TYPES (Prometheus text format)
+# --------------------------
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1.0):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}  # {labels: [bucket counts..., sum, count]}
+        self.lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self.lock:
+            for labels, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "foresky_request_duration_seconds", "Request latency per route", ("method", "route", "status"))
+REQUEST_QUERIES = Histogram(
+    "foresky_request_sql_queries", "SQL statements executed per request", ("method", "route"), QUERY_COUNT_BUCKETS)
+REQUEST_SQL_TIME = Histogram(
+    "foresky_request_sql_duration_seconds", "Total SQL time per request", ("method", "route"))
+SQL_QUERIES = Counter("foresky_sql_queries_total", "SQL statements executed")
+SLOW_QUERIES = Counter("foresky_sql_slow_queries_total", f"SQL statements slower than {SLOW_QUERY_MS:g} ms")
+
+ALL_METRICS = (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_SQL_TIME, SQL_QUERIES, SLOW_QUERIES)
+
+
+def render_latest():
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --------------------------
+# PER-REQUEST SQL STATS
+# --------------------------
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+# Set by the middleware; sync endpoints run in a threadpool that copies the context,
+# so the cursor events below update the same RequestStats object.
+current_request_stats: ContextVar = ContextVar("current_request_stats", default=None)
+
+
+def instrument_engine(engine):
+    """Count and time every statement executed on engine, logging slow ones"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        SQL_QUERIES.inc()
+
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            SLOW_QUERIES.inc()
+            print(f"🐢 Slow query ({elapsed * 1000:.1f} ms): {' '.join(statement.split())[:500]}")
+
+
+# --------------------------
+# MIDDLEWARE
+# --------------------------
+def route_label(request):
+    """Route template (e.g. /users/me/notes/{note_id}) rather than the raw path, to keep label cardinality bounded"""
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+async def metrics_middleware(request, call_next):
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        current_request_stats.reset(token)
+        method, route = request.method, route_label(request)
+        REQUEST_LATENCY.observe(elapsed, (method, route, str(status_code)))
+        REQUEST_QUERIES.observe(stats.queries, (method, route))
+        REQUEST_SQL_TIME.observe(stats.sql_seconds, (method, route))
@@ -0,0 +1,116 @@
+"""
+Schema migrations for existing databases (Base.metadata.create_all only creates missing tables).
+
+    python migrations.py
+
+Every step is idempotent, so the whole list is safe to re-run; run it before deploying new code.
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+from database import engine
+
+
+def add_column(conn, table, column, ddl):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+    if column in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    print(f"✅ Added {table}.{column}")
+
+
+def migrate_tags_per_user(conn):
+    """
+    Global tags -> per-user tag namespaces:
+    1. adds tags.owner_id,
+    2. gives every tag to the owner of the notes using it: the first owner keeps the
+       original row, every other owner gets their own copy and their note links are moved to it,
+    3. drops the old global UNIQUE(name) constraint and creates the unique (owner_id, name) index.
+    Tags no note uses have no owner to infer; they keep owner_id NULL and are reported.
+    """
+    add_column(conn, "tags", "owner_id", "INTEGER REFERENCES users(id)")
+
+    # Global uniqueness would block two users from having a tag with the same name
+    for constraint in inspect(conn).get_unique_constraints("tags"):
+        if constraint["column_names"] != ["name"]:
+            continue
+        if engine.dialect.name == "sqlite":
+            # SQLite can't drop an inline constraint: rebuild the table without it
+            conn.execute(text("CREATE TABLE tags_new (id INTEGER PRIMARY KEY, name VARCHAR, owner_id INTEGER REFERENCES users(id))"))
+            conn.execute(text("INSERT INTO tags_new (id, name, owner_id) SELECT id, name, owner_id FROM tags"))
+            conn.execute(text("DROP TABLE tags"))
+            conn.execute(text("ALTER TABLE tags_new RENAME TO tags"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tags_id ON tags (id)"))
+        else:
+            conn.execute(text(f'ALTER TABLE tags DROP CONSTRAINT "{constraint["name"]}"'))
+        print("✅ Dropped global UNIQUE(name) on tags")
+
+    # (tag, owner) pairs still to assign, from the notes using each unowned tag
+    pairs = conn.execute(text("""
+        SELECT DISTINCT nt.tag_id, n.owner_id, t.name
+        FROM note_tags nt
+        JOIN notes n ON n.id = nt.note_id
+        JOIN tags t ON t.id = nt.tag_id
+        WHERE t.owner_id IS NULL AND n.owner_id IS NOT NULL
+        ORDER BY nt.tag_id, n.owner_id
+    """)).fetchall()
+
+    assigned, copied = set(), 0
+    for tag_id, owner_id, name in pairs:
+        if tag_id not in assigned:
+            conn.execute(text("UPDATE tags SET owner_id = :owner WHERE id = :tag"),
+                         {"owner": owner_id, "tag": tag_id})
+            assigned.add(tag_id)
+            continue
+
+        # Plain SQL, not models.Tag: the model may have columns that later steps add
+        new_id = conn.execute(text("INSERT INTO tags (name, owner_id) VALUES (:name, :owner) RETURNING id"),
+                              {"name": name, "owner": owner_id}).scalar()
+        conn.execute(text("""
+            UPDATE note_tags SET tag_id = :new_tag
+            WHERE tag_id = :old_tag AND note_id IN (SELECT id FROM notes WHERE owner_id = :owner)
+        """), {"new_tag": new_id, "old_tag": tag_id, "owner": owner_id})
+        copied += 1
+    print(f"✅ Assigned {len(assigned)} tag(s) to their owners, copied {copied} shared tag(s)")
+
+    orphans = conn.execute(text("SELECT COUNT(*) FROM tags WHERE owner_id IS NULL")).scalar()
+    if orphans:
+        print(f"⚠️ {orphans} unused tag(s) have no owner and will not be listed for anyone")
+
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_tags_owner_id_name ON tags (owner_id, name)"))
+    print("✅ Unique (owner_id, name) index in place")
+
+
+def add_note_versions(conn):
+    """notes.version for optimistic concurrency (PATCH /users/me/notes/{id})"""
+    add_column(conn, "notes", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def add_sync_tracking(conn):
+    """
+    notes.updated_at / notes.deleted_at, tags.updated_at and the (owner_id, updated_at) index
+    for delta sync (GET /users/me/sync). Existing rows count as changed now.
+    """
+    add_column(conn, "notes", "updated_at", "TIMESTAMP")
+    add_column(conn, "notes", "deleted_at", "TIMESTAMP")
+    add_column(conn, "tags", "updated_at", "TIMESTAMP")
+    now = datetime.utcnow()
+    for table in ("notes", "tags"):
+        backfilled = conn.execute(text(f"UPDATE {table} SET updated_at = :now WHERE updated_at IS NULL"), {"now": now}).rowcount
+        if backfilled:
+            print(f"✅ Backfilled {table}.updated_at on {backfilled} row(s)")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_notes_owner_id_updated_at ON notes (owner_id, updated_at)"))
+    print("✅ (owner_id, updated_at) index on notes in place")
+
+
+MIGRATIONS = [migrate_tags_per_user, add_note_versions, add_sync_tracking]
+
+
+def migrate():
+    with engine.begin() as conn:
+        for step in MIGRATIONS:
+            step(conn)
+
+
+if __name__ == "__main__":
+    migrate()
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean, Index, LargeBinary, DateTime
 from sqlalchemy.orm import relationship
 from database import Base
+from compression import CompressedString
 
 # Association table: Many-to-Many relation between Notes and Tags
 note_tags = Table(
@@ -22,14 +24,63 @@ class User(Base):
 class Tag(Base):
     __tablename__ = "tags"
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True)
+    name = Column(String)  # unique per owner (see ix_tags_owner_id_name)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # delta sync (see sync.py)
+
+    # Tags are namespaced per user: this index also serves every "tags of user X" lookup
+    __table_args__ = (Index("ix_tags_owner_id_name", "owner_id", "name", unique=True),)
 
 class Note(Base):
     __tablename__ = "notes"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    content = Column(String)
+    content = Column(CompressedString)  # large bodies optionally stored compressed (NOTE_COMPRESS_MIN_BYTES)
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="notes")
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on every write (compare-and-swap)
+    # Delta sync (see sync.py): every write, including tag link changes, bumps updated_at;
+    # deletes leave a tombstone (deleted_at set, content cleared) until sync.purge_tombstones
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted_at = Column(DateTime, nullable=True)
+
+    tags = relationship("Tag", secondary=note_tags, backref="notes")
+    revisions = relationship("NoteRevision", back_populates="note", cascade="all, delete-orphan")
+
+    __table_args__ = (Index("ix_notes_owner_id_updated_at", "owner_id", "updated_at"),)
+
+class NoteRevision(Base):
+    """One version of a note: a full snapshot or a delta against the previous revision (see revisions.py)"""
+    __tablename__ = "note_revisions"
+    id = Column(Integer, primary_key=True, index=True)
+    note_id = Column(Integer, ForeignKey("notes.id"), nullable=False)
+    number = Column(Integer, nullable=False)  # 1, 2, ... per note
+    is_snapshot = Column(Boolean, default=False)
+    data = Column(LargeBinary)  # zlib-compressed JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+    note = relationship("Note", back_populates="revisions")
+
+    __table_args__ = (Index("ix_note_revisions_note_id_number", "note_id", "number", unique=True),)
+
+class EmailToken(Base):
+    """A verification link (the token's jti): usable once, until it expires or a newer one is issued"""
+    __tablename__ = "email_tokens"
+    jti = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)
+
+class OutboxEmail(Base):
+    """Outgoing email, sent by the leader's dispatcher (see mail.py)"""
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0)
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
 
-    tags = relationship("Tag", secondary=note_tags, backref="notes")
\ No newline at end of file
+    __table_args__ = (Index("ix_email_outbox_sent_at_next_attempt_at", "sent_at", "next_attempt_at"),)
@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from fastapi import HTTPException, Request, status
+
+import broadcast
+
+
+# --------------------------
+# TOKEN BUCKET STORES
+# --------------------------
+class MemoryStore:
+    """
+    In-process token-bucket store (the local stand-in).
+    A shared store (e.g. Redis) only needs the same take() method, plus a no-op consume()
+    (takes allowed by other workers are replayed through it, see apply_remote_take).
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.buckets = {}  # {key: (tokens, last_refill_time, seconds_to_refill_fully)}
+        self.lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def take(self, key, capacity, refill_per_second, cost=1.0):
+        """Try to take cost tokens; returns (allowed, seconds until enough tokens are available)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, last, _ = self.buckets.get(key, (capacity, now, 0.0))
+            tokens = min(capacity, tokens + (now - last) * refill_per_second)
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / refill_per_second
+            self.buckets[key] = (tokens, now, (capacity - tokens) / refill_per_second)
+            if len(self.buckets) > self.max_keys:
+                self.evict_full(now)
+        return allowed, retry_after
+
+    def consume(self, key, capacity, refill_per_second, cost=1.0):
+        """Take cost tokens unconditionally (a take another worker already allowed)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, last, _ = self.buckets.get(key, (capacity, now, 0.0))
+            tokens = max(0.0, min(capacity, tokens + (now - last) * refill_per_second) - cost)
+            self.buckets[key] = (tokens, now, (capacity - tokens) / refill_per_second)
+
+    def evict_full(self, now):
+        """Drop buckets that have refilled completely: they behave exactly like missing ones"""
+        for key in [k for k, (_, last, refill) in self.buckets.items() if now - last >= refill]:
+            del self.buckets[key]
+
+
+STORES = {"memory": MemoryStore}
+
+
+def create_store():
+    store_name = os.getenv("RATE_LIMIT_STORE", "memory")
+    if store_name not in STORES:
+        raise ValueError(f"Unknown RATE_LIMIT_STORE '{store_name}' (available: {', '.join(STORES)})")
+    return STORES[store_name]()
+
+
+store = create_store()
+
+
+def apply_remote_take(take):
+    # Workers each keep their own buckets and replay each other's allowed takes,
+    # so N workers still allow `capacity` attempts in total, not N times that
+    if take["pid"] != os.getpid():
+        store.consume(take["key"], take["capacity"], take["refill_per_second"])
+
+
+broadcast.bus.subscribe("rate_limit", apply_remote_take)
+
+
+# --------------------------
+# LIMITERS
+# --------------------------
+def parse_rate(value):
+    """'5/60' -> (capacity=5, per_seconds=60)"""
+    capacity, per_seconds = value.split("/")
+    return float(capacity), float(per_seconds)
+
+
+class RateLimiter:
+    def __init__(self, name, default_rate):
+        self.name = name
+        # e.g. RATE_LIMIT_LOGIN_IP="10/60"
+        self.capacity, per_seconds = parse_rate(os.getenv(f"RATE_LIMIT_{name.upper()}", default_rate))
+        self.refill_per_second = self.capacity / per_seconds
+
+    def check(self, key):
+        """Raise 429 when key has used up its bucket"""
+        bucket = f"{self.name}:{key}"
+        allowed, retry_after = store.take(bucket, self.capacity, self.refill_per_second)
+        if allowed:
+            broadcast.bus.publish("rate_limit", {"pid": os.getpid(), "key": bucket, "capacity": self.capacity,
+                                                 "refill_per_second": self.refill_per_second})
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts. Please try again later.",
+                headers={"Retry-After": str(int(retry_after) + 1)},
+            )
+
+
+login_ip_limiter = RateLimiter("login_ip", "20/60")
+login_email_limiter = RateLimiter("login_email", "5/60")
+register_ip_limiter = RateLimiter("register_ip", "5/600")
+resend_ip_limiter = RateLimiter("resend_ip", "10/600")
+resend_email_limiter = RateLimiter("resend_email", "3/600")
+
+
+def client_ip(request: Request):
+    # Behind Render's proxy the last X-Forwarded-For hop is the one it appended (the real client);
+    # earlier entries are client-controlled.
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def limit_by_ip(limiter):
+    """FastAPI dependency enforcing limiter per client IP"""
+    def dependency(request: Request):
+        limiter.check(client_ip(request))
+    return dependency
+
+
+def email_key(email):
+    return email.strip().lower()
+
+
+# --------------------------
+# REQUEST COALESCING
+# --------------------------
+class Coalescer:
+    """
+    Runs one call per key at a time: concurrent callers with the same key
+    wait for the in-flight call and share its result (or exception).
+    """
+
+    def __init__(self):
+        self.in_flight = {}  # {key: [done_event, result, exception]}
+        self.lock = threading.Lock()
+
+    def run(self, key, func):
+        with self.lock:
+            call = self.in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self.in_flight[key] = [threading.Event(), None, None]
+
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+
+        try:
+            call[1] = func()
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            call[0].set()
+        return call[1]
+
+
+resend_coalescer = Coalescer()
@@ -0,0 +1,146 @@
+import json
+import zlib
+import difflib
+from sqlalchemy import func
+
+import models
+
+# Every SNAPSHOT_EVERY-th revision (1, 11, 21, ...) stores the full note, the others only a
+# delta against the previous revision, so rebuilding any revision applies at most SNAPSHOT_EVERY - 1 deltas.
+SNAPSHOT_EVERY = 10
+
+
+# --------------------------
+# ENCODING
+# --------------------------
+def note_state(note):
+    return {"title": note.title, "content": note.content, "tag_ids": sorted(tag.id for tag in note.tags)}
+
+
+def encode(payload):
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def decode(data):
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def content_ops(old_text, new_text):
+    """Line delta: [start, end] copies old lines, a string inserts new text"""
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(new_lines[j1:j2]))
+    return ops
+
+
+def apply_content_ops(old_text, ops):
+    old_lines = old_text.splitlines(keepends=True)
+    return "".join("".join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+
+def make_delta(old, new):
+    """Only what changed between two note states"""
+    delta = {}
+    if new["title"] != old["title"]:
+        delta["title"] = new["title"]
+    if new["tag_ids"] != old["tag_ids"]:
+        delta["tag_ids"] = new["tag_ids"]
+    if new["content"] != old["content"]:
+        if old["content"] is None or new["content"] is None:
+            delta["content"] = new["content"]
+        else:
+            delta["content_ops"] = content_ops(old["content"], new["content"])
+    return delta
+
+
+def apply_delta(state, delta):
+    state = dict(state)
+    for key in ("title", "tag_ids", "content"):
+        if key in delta:
+            state[key] = delta[key]
+    if "content_ops" in delta:
+        state["content"] = apply_content_ops(state["content"], delta["content_ops"])
+    return state
+
+
+# --------------------------
+# STORAGE
+# --------------------------
+def add_revision(db, note_id, number, state, previous_state=None):
+    is_snapshot = previous_state is None or (number - 1) % SNAPSHOT_EVERY == 0
+    payload = state if is_snapshot else make_delta(previous_state, state)
+    revision = models.NoteRevision(note_id=note_id, number=number, is_snapshot=is_snapshot, data=encode(payload))
+    db.add(revision)
+    return revision
+
+
+def record_revision(db, note, previous_state=None, state=None):
+    """
+    Store the note's current state (or the given state) as its next revision (the caller commits).
+    previous_state is the state before this change; omit it for a new note.
+    Returns None when nothing changed.
+    """
+    if state is None:
+        state = note_state(note)
+    if previous_state == state:
+        return None
+
+    last_number = db.query(func.max(models.NoteRevision.number)).filter(
+        models.NoteRevision.note_id == note.id
+    ).scalar() or 0
+    if last_number == 0:
+        if previous_state is None:
+            return add_revision(db, note.id, 1, state)
+        # Note predates revision history: keep its old state as the baseline
+        add_revision(db, note.id, 1, previous_state)
+        return add_revision(db, note.id, 2, state, previous_state)
+
+    # Delta against the newest stored revision, not previous_state: another write may have been
+    # recorded since the caller read the note, and the delta has to apply on top of that one
+    latest = load_state(db, note.id, last_number)
+    latest = {key: latest[key] for key in ("title", "content", "tag_ids")} if latest else None
+    return add_revision(db, note.id, last_number + 1, state, latest)
+
+
+def load_state(db, note_id, number):
+    """Rebuild a revision from the closest snapshot at or before it; None if it doesn't exist"""
+    snapshot_number = db.query(func.max(models.NoteRevision.number)).filter(
+        models.NoteRevision.note_id == note_id,
+        models.NoteRevision.is_snapshot == True,
+        models.NoteRevision.number <= number
+    ).scalar()
+    if snapshot_number is None:
+        return None
+
+    rows = db.query(models.NoteRevision).filter(
+        models.NoteRevision.note_id == note_id,
+        models.NoteRevision.number.between(snapshot_number, number)
+    ).order_by(models.NoteRevision.number).all()
+    if rows[-1].number != number:
+        return None
+
+    state = decode(rows[0].data)
+    for row in rows[1:]:
+        state = apply_delta(state, decode(row.data))
+    state["created_at"] = rows[-1].created_at
+    return state
+
+
+def diff_states(old, new, old_number, new_number):
+    """Unified diff of the content between two revisions (title changes shown as a header line)"""
+    lines = []
+    if old["title"] != new["title"]:
+        lines.append(f"title: {old['title']!r} -> {new['title']!r}\n")
+    lines.extend(difflib.unified_diff(
+        (old["content"] or "").splitlines(keepends=True),
+        (new["content"] or "").splitlines(keepends=True),
+        fromfile=f"revision {old_number}",
+        tofile=f"revision {new_number}",
+    ))
+    return "".join(lines)
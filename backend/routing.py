@@ -0,0 +1,68 @@
+import os
+import time
+import itertools
+import threading
+
+import security
+import broadcast
+from database import SessionLocal, ReplicaSessionLocals
+
+# How long a user's reads stay on the primary after they wrote something; keep it above the replicas' usual lag
+STICKY_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+# --------------------------
+# READ-YOUR-WRITES STICKINESS
+# --------------------------
+class Stickiness:
+    """
+    Record of who wrote recently (keyed by token subject), kept by every worker:
+    marks are broadcast, so the next read is pinned whichever worker serves it.
+    Per host: a user whose writes hit another instance may briefly read stale data there.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.until = {}  # {subject: monotonic time until which reads go to the primary}
+        self.lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def mark(self, subject):
+        now = time.monotonic()
+        with self.lock:
+            self.until[subject] = now + STICKY_SECONDS
+            if len(self.until) > self.max_keys:
+                for key in [k for k, until in self.until.items() if until <= now]:
+                    del self.until[key]
+
+    def is_sticky(self, subject):
+        with self.lock:
+            return self.until.get(subject, 0) > time.monotonic()
+
+
+stickiness = Stickiness()
+broadcast.bus.subscribe("read_your_writes", stickiness.mark)
+replica_sessions = itertools.cycle(ReplicaSessionLocals) if ReplicaSessionLocals else None
+
+
+def open_read_session(subject=None):
+    """Session for read-only work: a replica (round-robin), or the primary when there are none or subject just wrote"""
+    if replica_sessions is None or (subject and stickiness.is_sticky(subject)):
+        return SessionLocal()
+    return next(replica_sessions)()
+
+
+def bearer_subject(request):
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    return security.token_subject(token) if scheme.lower() == "bearer" and token else None
+
+
+async def routing_middleware(request, call_next):
+    """After a successful write, pin the writer's reads to the primary for STICKY_SECONDS"""
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        subject = bearer_subject(request)
+        if subject:
+            broadcast.bus.publish("read_your_writes", subject)  # marks it here and in the other workers
+    return response
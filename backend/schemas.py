@@ -1,5 +1,11 @@
-from pydantic import BaseModel
+import os
+from pydantic import BaseModel, Field
 from typing import List, Optional
+from datetime import datetime
+
+# Server-side size limits for incoming notes (titles are indexed, keep them short)
+MAX_TITLE_CHARS = 255
+MAX_NOTE_CONTENT_CHARS = int(os.getenv("MAX_NOTE_CONTENT_CHARS", "100000"))
 
 class NoteBase(BaseModel):
     title: str
@@ -7,7 +13,8 @@ class NoteBase(BaseModel):
     tag_ids: List[int] = []   # references existing tags by ID
 
 class NoteCreate(NoteBase):
-    pass
+    title: str = Field(..., max_length=MAX_TITLE_CHARS)
+    content: Optional[str] = Field(None, max_length=MAX_NOTE_CONTENT_CHARS)
 
 class TagBase(BaseModel):
     name: str
@@ -20,22 +27,68 @@ class Tag(TagBase):
 class Note(NoteBase):
     id: int
     tags: List[Tag] = []
+    version: int = 1
     class Config:
         from_attributes = True
 
+class NotePatch(BaseModel):
+    # Partial update: only the fields sent are written, and only if the note is still at `version`
+    version: int
+    title: Optional[str] = Field(None, max_length=MAX_TITLE_CHARS)
+    content: Optional[str] = Field(None, max_length=MAX_NOTE_CONTENT_CHARS)
+    tag_ids: Optional[List[int]] = None
+
+# Revision Schemas
+class NoteRevisionInfo(BaseModel):
+    number: int
+    is_snapshot: bool
+    created_at: datetime
+    class Config:
+        from_attributes = True
+
+class NoteRevision(BaseModel):
+    number: int
+    title: str
+    content: Optional[str] = None
+    tag_ids: List[int] = []
+    created_at: datetime
+
+class NoteRevisionDiff(BaseModel):
+    from_number: int
+    to_number: int
+    diff: str
+
 # User Schemas
+class SyncChanges(BaseModel):
+    # GET /users/me/sync: one page of changes since a sync token
+    notes: List[Note] = []        # created or changed
+    deleted: List[int] = []       # ids of deleted notes
+    tags: List[Tag] = []          # created or renamed
+    tag_ids: List[int] = []       # every live tag id (anything else was deleted)
+    full: bool                    # token missing/expired: notes is everything, replace local data
+    has_more: bool
+    next: str
+
 class UserBase(BaseModel):
     email: str
 
 class UserCreate(UserBase):
     password: str
 
-class User(UserBase):
+class UserProfile(UserBase):
     id: int
     is_active: bool
-    notes: List[Note] = []
+    is_verified: bool = False
     class Config:
         from_attributes = True
+
+class UserWithNotes(UserProfile):
+    # Only present with GET /users/me/?include=notes (one page of notes)
+    notes: Optional[List[Note]] = None
+    notes_total: Optional[int] = None
+
+class User(UserProfile):
+    notes: List[Note] = []
         
 # Token Schemas
 class Token(BaseModel):
@@ -34,17 +34,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def token_subject(token: str) -> Optional[str]:
+    """'sub' of a valid token, None otherwise"""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+# --------------------------
+# EVENT STREAM TOKEN
+# --------------------------
+# EventSource can't send headers, so the stream is opened with a token in the URL (which proxies and
+# access logs keep): a short-lived one good for nothing else, not the access token
+EVENTS_TOKEN_SECONDS = 60
+EVENTS_TOKEN_PURPOSE = "events"
+
+def create_events_token(email: str):
+    expire = datetime.utcnow() + timedelta(seconds=EVENTS_TOKEN_SECONDS)
+    return jwt.encode({"sub": email, "exp": expire, "purpose": EVENTS_TOKEN_PURPOSE}, SECRET_KEY, algorithm=ALGORITHM)
+
+
 # --------------------------
 # EMAIL VERIFICATION TOKENS
 # --------------------------
-def create_email_token(email: str):
-    expire = datetime.utcnow() + timedelta(hours=24)
-    to_encode = {"sub": email, "exp": expire}
+EMAIL_TOKEN_HOURS = 24
+EMAIL_TOKEN_PURPOSE = "verify_email"  # keeps these links from working as access tokens
+# Links issued before single-use tokens (no jti, no purpose) expire within EMAIL_TOKEN_HOURS of the deploy
+# that replaced them. To honour them, set LEGACY_EMAIL_TOKENS_UNTIL (UTC, ISO 8601) to that deploy's time
+# + EMAIL_TOKEN_HOURS. Unset, no jti-less link is accepted (their users can ask for a new one at /auth/resend).
+LEGACY_EMAIL_TOKENS_UNTIL = os.getenv("LEGACY_EMAIL_TOKENS_UNTIL")
+LEGACY_EMAIL_TOKENS_UNTIL = datetime.fromisoformat(LEGACY_EMAIL_TOKENS_UNTIL) if LEGACY_EMAIL_TOKENS_UNTIL else None
+
+def create_email_token(email: str, jti: str, expire: datetime):
+    # jti names the single-use record (models.EmailToken) that has to exist for the link to work
+    to_encode = {"sub": email, "exp": expire, "jti": jti, "purpose": EMAIL_TOKEN_PURPOSE}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_email_token(token: str) -> Optional[str]:
+def verify_email_token(token: str) -> Optional[tuple]:
+    """(email, jti) of a valid verification link, None otherwise (jti is None for a legacy link)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    if payload.get("sub") is None:
+        return None
+    if payload.get("jti") is not None:
+        if payload.get("purpose") != EMAIL_TOKEN_PURPOSE:
+            return None
+        return payload["sub"], payload["jti"]
+    # Legacy link: looks like an access token, so only during the transition and only if it expires by its end
+    # (access tokens last longer than EMAIL_TOKEN_HOURS)
+    if LEGACY_EMAIL_TOKENS_UNTIL is None or payload.get("purpose") is not None:
+        return None
+    if datetime.utcnow() >= LEGACY_EMAIL_TOKENS_UNTIL:
+        return None
+    if payload.get("exp") is None or datetime.utcfromtimestamp(payload["exp"]) > LEGACY_EMAIL_TOKENS_UNTIL:
+        return None
+    return payload["sub"], None
\ No newline at end of file
@@ -0,0 +1,79 @@
+import models
+
+
+# --------------------------
+# ROW BUILDERS
+# Build response dicts straight from column tuples instead of loading ORM objects
+# and validating them into schemas.Note / schemas.Tag one by one.
+# Shapes match the schemas exactly.
+# --------------------------
+def tag_rows(query):
+    return [{"name": name, "id": tag_id} for tag_id, name in query.with_entities(models.Tag.id, models.Tag.name)]
+
+
+def note_rows(db, owner_id, limit=None, offset=0):
+    """A user's notes (optionally one page) with their tags, in two queries (notes + tag links) instead of one per note"""
+    notes_query = (
+        db.query(models.Note.id, models.Note.title, models.Note.content, models.Note.version)
+        .filter(models.Note.owner_id == owner_id, models.Note.deleted_at.is_(None))
+        .order_by(models.Note.id)
+    )
+    if limit is not None:
+        notes_query = notes_query.limit(limit).offset(offset)
+    notes = notes_query.all()
+    if not notes:
+        return []
+
+    if limit is not None:
+        tags_by_note = note_tag_dicts(db, [note[0] for note in notes])
+    else:
+        # Whole collection: join on the owner instead of sending every note id back
+        tags_by_note = {}
+        links = (
+            db.query(models.note_tags.c.note_id, models.Tag.id, models.Tag.name)
+            .join(models.Tag, models.Tag.id == models.note_tags.c.tag_id)
+            .join(models.Note, models.Note.id == models.note_tags.c.note_id)
+            .filter(models.Note.owner_id == owner_id)
+            .order_by(models.note_tags.c.note_id, models.Tag.id)
+        )
+        for note_id, tag_id, name in links:
+            tags_by_note.setdefault(note_id, []).append({"name": name, "id": tag_id})
+
+    return [
+        note_row(note_id, title, content, tags_by_note.get(note_id, []), version)
+        for note_id, title, content, version in notes
+    ]
+
+
+def note_tag_dicts(db, note_ids):
+    """{note_id: [tag dicts]} for the given notes, in one query"""
+    tags_by_note = {}
+    if not note_ids:
+        return tags_by_note
+    links = (
+        db.query(models.note_tags.c.note_id, models.Tag.id, models.Tag.name)
+        .join(models.Tag, models.Tag.id == models.note_tags.c.tag_id)
+        .filter(models.note_tags.c.note_id.in_(note_ids))
+        .order_by(models.note_tags.c.note_id, models.Tag.id)
+    )
+    for note_id, tag_id, name in links:
+        tags_by_note.setdefault(note_id, []).append({"name": name, "id": tag_id})
+    return tags_by_note
+
+
+def tag_dicts(names_by_id):
+    return [{"name": name, "id": tag_id} for tag_id, name in sorted(names_by_id.items())]
+
+
+def note_row(note_id, title, content, tags, version):
+    return {"title": title, "content": content, "tag_ids": [], "id": note_id, "tags": tags, "version": version}
+
+
+def tag_row(tag):
+    return {"name": tag.name, "id": tag.id}
+
+
+def note_to_row(note):
+    """note_row() from a loaded ORM note"""
+    return note_row(note.id, note.title, note.content,
+                    [tag_row(tag) for tag in sorted(note.tags, key=lambda tag: tag.id)], note.version)
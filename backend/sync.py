@@ -0,0 +1,93 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+
+import models, serializers
+
+# A write can commit after a token covering its updated_at was handed out (concurrent transactions,
+# clock skew between instances): every delta re-sends this window, clients upsert by note version.
+OVERLAP = timedelta(seconds=float(os.getenv("SYNC_OVERLAP_SECONDS", "5")))
+# Tombstones are kept this long; older tokens get a full sync instead of a delta
+TOMBSTONE_RETENTION = timedelta(days=int(os.getenv("SYNC_TOMBSTONE_DAYS", "30")))
+
+EPOCH = datetime(1970, 1, 1)
+
+
+# --------------------------
+# SYNC TOKENS
+# --------------------------
+def encode_token(updated_at, note_id=0):
+    """
+    '<microseconds since epoch>-<note id>' (opaque to clients).
+    note id 0: sync finished, the next delta starts at that time (minus OVERLAP);
+    otherwise a page cursor: continue after (updated_at, note id).
+    """
+    return f"{(updated_at - EPOCH) // timedelta(microseconds=1)}-{note_id}"
+
+
+def decode_token(token):
+    """(updated_at, note id), or None if it isn't one of our tokens"""
+    try:
+        micros, note_id = token.split("-")
+        return EPOCH + timedelta(microseconds=int(micros)), int(note_id)
+    except (ValueError, OverflowError):
+        return None
+
+
+# --------------------------
+# CHANGES
+# --------------------------
+def changes(db, owner_id, since=None, limit=500):
+    """
+    Notes created/changed/deleted after the decoded token since (all live notes when since is None
+    or older than the tombstone retention), as a range scan on (owner_id, updated_at).
+    Tag link changes bump the note, and note rows carry their tags, so links need no separate feed.
+    Tags are few: changed ones are sent in full plus the ids of all live ones (to drop deleted tags).
+    """
+    now = datetime.utcnow()
+    full = since is None or (since[1] == 0 and since[0] < now - TOMBSTONE_RETENTION)
+
+    notes_query = db.query(
+        models.Note.id, models.Note.title, models.Note.content, models.Note.version,
+        models.Note.updated_at, models.Note.deleted_at
+    ).filter(models.Note.owner_id == owner_id)
+    tags_query = db.query(models.Tag).filter(models.Tag.owner_id == owner_id)
+    if full:
+        notes_query = notes_query.filter(models.Note.deleted_at.is_(None))
+    elif since[1] == 0:
+        notes_query = notes_query.filter(models.Note.updated_at > since[0] - OVERLAP)
+        tags_query = tags_query.filter(models.Tag.updated_at > since[0] - OVERLAP)
+    else:
+        # Next page: keyset on (updated_at, id)
+        notes_query = notes_query.filter(or_(
+            models.Note.updated_at > since[0],
+            and_(models.Note.updated_at == since[0], models.Note.id > since[1])
+        ))
+        tags_query = tags_query.filter(models.Tag.updated_at > since[0] - OVERLAP)
+
+    rows = notes_query.order_by(models.Note.updated_at, models.Note.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    live = [row for row in rows if row.deleted_at is None]
+    tags_by_note = serializers.note_tag_dicts(db, [row.id for row in live])
+    return {
+        "notes": [
+            serializers.note_row(row.id, row.title, row.content, tags_by_note.get(row.id, []), row.version)
+            for row in live
+        ],
+        "deleted": [row.id for row in rows if row.deleted_at is not None],
+        "tags": serializers.tag_rows(tags_query.order_by(models.Tag.id)),
+        "tag_ids": [tag_id for (tag_id,) in db.query(models.Tag.id).filter(models.Tag.owner_id == owner_id)],
+        "full": full,
+        "has_more": has_more,
+        "next": encode_token(rows[-1].updated_at, rows[-1].id) if has_more else encode_token(now),
+    }
+
+
+def purge_tombstones(db):
+    """Hard-delete tombstones past the retention window (their tokens already fall back to a full sync)"""
+    cutoff = datetime.utcnow() - TOMBSTONE_RETENTION
+    purged = db.query(models.Note).filter(models.Note.deleted_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return purged
@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import update, or_
+
+import models, security
+
+
+# --------------------------
+# SINGLE-USE VERIFICATION TOKENS
+# --------------------------
+def issue_token(db, user):
+    """New verification token for user; earlier unused ones stop working (the caller commits)"""
+    db.query(models.EmailToken).filter(
+        models.EmailToken.user_id == user.id,
+        models.EmailToken.used_at.is_(None)
+    ).delete(synchronize_session=False)
+    jti = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(hours=security.EMAIL_TOKEN_HOURS)
+    db.add(models.EmailToken(jti=jti, user_id=user.id, expires_at=expires_at))
+    return security.create_email_token(user.email, jti, expires_at)
+
+
+def consume_token(db, jti, user_id):
+    """Mark the token used; False if it was used, replaced or expired already (atomic, so concurrent clicks can't both win)"""
+    now = datetime.utcnow()
+    result = db.execute(
+        update(models.EmailToken)
+        .where(
+            models.EmailToken.jti == jti,
+            models.EmailToken.user_id == user_id,
+            models.EmailToken.used_at.is_(None),
+            models.EmailToken.expires_at > now
+        )
+        .values(used_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def purge_tokens(db):
+    """Delete used and expired tokens (verification never looks at them again)"""
+    purged = db.query(models.EmailToken).filter(or_(
+        models.EmailToken.used_at.isnot(None),
+        models.EmailToken.expires_at < datetime.utcnow()
+    )).delete(synchronize_session=False)
+    db.commit()
+    return purged
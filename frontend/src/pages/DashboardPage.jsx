@@ -68,25 +68,113 @@ function DashboardPage() {
     fetchStats();
   }, []);
 
+  // Apply changes in place (idempotent: our own responses and the live events both land here)
+  const upsertNote = (note) => {
+    setNotes((prev) => {
+      const existing = prev.find((n) => n.id === note.id);
+      if (!existing) return [...prev, note];
+      if (existing.version > note.version) return prev; // stale event
+      return prev.map((n) => (n.id === note.id ? note : n));
+    });
+  };
+
+  const removeNote = (id) => setNotes((prev) => prev.filter((n) => n.id !== id));
+
+  const upsertTag = (tag) => {
+    setTags((prev) => prev.some((t) => t.id === tag.id) ? prev.map((t) => (t.id === tag.id ? tag : t)) : [...prev, tag]);
+    // Renames show up on every note carrying the tag
+    setNotes((prev) => prev.map((n) => n.tags && n.tags.some((t) => t.id === tag.id)
+      ? { ...n, tags: n.tags.map((t) => (t.id === tag.id ? tag : t)) }
+      : n));
+  };
+
+  const removeTag = (id) => setTags((prev) => prev.filter((t) => t.id !== id));
+
+  // Counts follow the local collections instead of refetching /users/me/stats after every change
+  useEffect(() => {
+    setStats((prev) => ({ ...prev, notes_count: notes.length, tags_count: tags.length }));
+  }, [notes, tags]);
+
+  // Live updates from other sessions (SSE)
+  useEffect(() => {
+    if (!localStorage.getItem("accessToken")) return;
+
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+    let connectedOnce = false;
+    const refetchAll = () => {
+      fetchNotes();
+      fetchTags();
+    };
+    const reconnect = () => {
+      if (source) source.close();
+      if (!closed) retryTimer = setTimeout(connect, 3000);
+    };
+
+    // EventSource can't send the Authorization header: each connection gets its own short-lived
+    // stream token (EventSource's own reconnects would reuse an expired one)
+    async function connect() {
+      let token;
+      try {
+        token = (await apiClient.post("/users/me/events/token")).data.token;
+      } catch (err) {
+        if (err.response?.status !== 401) reconnect();
+        return;
+      }
+      if (closed) return;
+
+      source = new EventSource(
+        `${import.meta.env.VITE_API_BASE_URL}/users/me/events?token=${encodeURIComponent(token)}`
+      );
+      const on = (type, handler) =>
+        source.addEventListener(type, (e) => {
+          const { data } = JSON.parse(e.data);
+          if (data.refetch) refetchAll(); // payload was too large to send
+          else handler(data);
+        });
+
+      // Sent on every (re)connect: anything missed while disconnected is picked up by one refetch
+      source.addEventListener("ready", () => {
+        if (connectedOnce) refetchAll();
+        connectedOnce = true;
+      });
+      source.addEventListener("resync", refetchAll);
+      on("note.created", upsertNote);
+      on("note.updated", upsertNote);
+      on("note.deleted", (data) => removeNote(data.id));
+      on("tag.created", upsertTag);
+      on("tag.updated", upsertTag);
+      on("tag.deleted", (data) => removeTag(data.id));
+      source.onerror = reconnect;
+    }
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, []);
+
   const handleAddNote = async (e) => {
     e.preventDefault();
     setError(""); 
     setSuccess("");
     
     try {
-      await apiClient.post("/users/me/notes/", { 
+      const res = await apiClient.post("/users/me/notes/", { 
         title, 
         content,
         tag_ids: selectedTags
       });
+      upsertNote(res.data);
       
       setTitle(""); 
       setContent("");
       setSelectedTags([]);
       setSuccess("Note created successfully! ✨");
       setShowFormSection(false);
-      fetchNotes();
-      fetchStats();
     } catch {
       setError("Could not add note.");
     }
@@ -95,11 +183,12 @@ function DashboardPage() {
   const handleUpdateNote = async (e) => {
     e.preventDefault();
     try {
-      await apiClient.put(`/users/me/notes/${editingNote.id}`, {
+      const res = await apiClient.put(`/users/me/notes/${editingNote.id}`, {
         title, 
         content,
         tag_ids: selectedTags
       });
+      upsertNote(res.data);
       
       setEditingNote(null);
       setTitle(""); 
@@ -107,7 +196,6 @@ function DashboardPage() {
       setSelectedTags([]);
       setSuccess("Note updated successfully! ✨");
       setShowFormSection(false);
-      fetchNotes();
     } catch {
       setError("Failed to edit note.");
     }
@@ -117,9 +205,8 @@ function DashboardPage() {
     if (!window.confirm("Are you sure you want to delete this note?")) return;
     try {
       await apiClient.delete(`/users/me/notes/${id}`);
+      removeNote(id);
       setSuccess("Note deleted successfully! 🗑️");
-      fetchNotes();
-      fetchStats();
     } catch {
       setError("Failed to delete note.");
     }
@@ -145,12 +232,9 @@ function DashboardPage() {
     
     try {
       const res = await apiClient.post("/tags/", { name: newTag.trim() });
-      if (!tags.find(t => t.id === res.data.id)) {
-        setTags((prev) => [...prev, res.data]);
-      }
+      upsertTag(res.data);
       setNewTag("");
       setSuccess("Tag created! 🏷️");
-      fetchStats();
     } catch {
       setError("Could not create tag.");
     }
@@ -161,9 +245,8 @@ function DashboardPage() {
     
     try {
       await apiClient.delete(`/tags/${tagId}`);
-      setTags(tags.filter(t => t.id !== tagId));
+      removeTag(tagId);
       setSuccess("Tag deleted! 🗑️");
-      fetchStats();
     } catch (err) {
       setError(err.response?.data?.detail || "Cannot delete tag");
     }
@@ -174,11 +257,10 @@ function DashboardPage() {
     
     try {
       const res = await apiClient.put(`/tags/${tagId}`, { name: editTagName.trim() });
-      setTags(tags.map(t => t.id === tagId ? res.data : t));
+      upsertTag(res.data);
       setEditingTag(null);
       setEditTagName("");
       setSuccess("Tag renamed! ✏️");
-      fetchNotes();
     } catch (err) {
       setError(err.response?.data?.detail || "Cannot edit tag");
     }
@@ -3,19 +3,17 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from pathlib import Path
 import json
+from snapshot import FolderSnapshot
+from snapshot_cache import SnapshotCache, default_cache_path
 
-class FolderStructureGenerator:
+class FolderStructureGenerator(FolderSnapshot):
     def __init__(self, root):
+        # Variables (base_folder, selected_items, file_extensions_to_include)
+        super().__init__()
         self.root = root
         self.root.title("Folder Structure & Content Generator")
         self.root.geometry("1200x800")
         
-        # Variables
-        self.base_folder = None
-        self.selected_items = {}  # {path: {'include_structure': bool, 'include_content': bool, 'expand': bool}}
-        self.file_extensions_to_include = ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.h', 
-                                          '.txt', '.md', '.json', '.xml', '.yaml', '.yml']
-        
         self.setup_ui()
         
     def setup_ui(self):
@@ -52,6 +50,15 @@ class FolderStructureGenerator:
         self.ext_entry.insert(0, ", ".join(self.file_extensions_to_include))
         ttk.Button(ext_frame, text="Update Filter", command=self.update_extensions).pack(side=tk.LEFT, padx=5)
         
+        # Exclusion filter (applied while scanning, on top of .gitignore files)
+        ttk.Label(ext_frame, text="Exclude:").pack(side=tk.LEFT, padx=5)
+        self.exclude_entry = ttk.Entry(ext_frame, width=30)
+        self.exclude_entry.pack(side=tk.LEFT, padx=5)
+        self.exclude_entry.insert(0, ", ".join(self.exclude_patterns))
+        self.gitignore_var = tk.BooleanVar(value=self.use_gitignore)
+        ttk.Checkbutton(ext_frame, text="Use .gitignore", variable=self.gitignore_var).pack(side=tk.LEFT, padx=5)
+        ttk.Button(ext_frame, text="Rescan", command=self.update_excludes).pack(side=tk.LEFT, padx=5)
+        
         # Left panel - File tree
         left_frame = ttk.LabelFrame(main_frame, text="File Browser", padding="10")
         left_frame.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 5))
@@ -119,6 +126,7 @@ class FolderStructureGenerator:
         if folder:
             self.base_folder = folder
             self.folder_label.config(text=f"Selected: {os.path.basename(folder)}")
+            self.cache = SnapshotCache(default_cache_path(folder))
             self.populate_tree()
             self.status_bar.config(text=f"Loaded folder: {folder}")
             
@@ -131,55 +139,28 @@ class FolderStructureGenerator:
             
         root_name = os.path.basename(self.base_folder)
         root_item = self.tree.insert('', 'end', text=root_name, values=('folder', '✓', '', '✓'))
-        self.selected_items[self.base_folder] = {
-            'include_structure': True, 
-            'include_content': False, 
-            'expand': True,
-            'is_folder': True
-        }
+        self.selected_items[self.base_folder] = self.make_item(self.base_folder, True)
         
         self.add_tree_items(root_item, self.base_folder)
+        self.refresh_flags()
         self.tree.item(root_item, open=True)
         
-    def add_tree_items(self, parent, path):
+    def add_tree_items(self, parent, path, ignore_files=()):
+        ignore_files = self.ignore_files_for(path, ignore_files)
         try:
-            items = []
-            for item in os.listdir(path):
-                if item.startswith('.'):  # Skip hidden files
-                    continue
-                item_path = os.path.join(path, item)
-                items.append((item, item_path, os.path.isdir(item_path)))
-            
-            # Sort: folders first, then files
-            items.sort(key=lambda x: (not x[2], x[0].lower()))
-            
-            for item_name, item_path, is_dir in items:
+            for item_name, item_path, is_dir in self.list_dir(path, ignore_files):
+                item = self.add_item(item_path, is_dir, path)
                 if is_dir:
                     tree_item = self.tree.insert(parent, 'end', text=item_name, 
                                                 values=('folder', '✓', '', '✓'))
-                    self.selected_items[item_path] = {
-                        'include_structure': True,
-                        'include_content': False,
-                        'expand': True,
-                        'is_folder': True
-                    }
                     # Recursively add children
-                    self.add_tree_items(tree_item, item_path)
+                    self.add_tree_items(tree_item, item_path, ignore_files)
                 else:
-                    ext = os.path.splitext(item_name)[1]
-                    include_content = ext in self.file_extensions_to_include
-                    content_mark = '✓' if include_content else ''
-                    
-                    tree_item = self.tree.insert(parent, 'end', text=item_name,
-                                                values=('file', '✓', content_mark, ''))
-                    self.selected_items[item_path] = {
-                        'include_structure': True,
-                        'include_content': include_content,
-                        'expand': False,
-                        'is_folder': False
-                    }
+                    content_mark = '✓' if item['include_content'] else ''
+                    self.tree.insert(parent, 'end', text=item_name,
+                                     values=('file', '✓', content_mark, ''))
         except PermissionError:
-            pass
+            self.selected_items[path]['unreadable'] = True
             
     def on_item_double_click(self, event):
         selected = self.tree.selection()
@@ -196,6 +177,7 @@ class FolderStructureGenerator:
             if col == '#3':  # include_structure column
                 self.selected_items[path]['include_structure'] = not self.selected_items[path]['include_structure']
                 self.tree.set(item, 'include_structure', '✓' if self.selected_items[path]['include_structure'] else '')
+                self.refresh_flags(path)
             elif col == '#4':  # include_content column
                 if not self.selected_items[path]['is_folder']:
                     self.selected_items[path]['include_content'] = not self.selected_items[path]['include_content']
@@ -204,6 +186,7 @@ class FolderStructureGenerator:
                 if self.selected_items[path]['is_folder']:
                     self.selected_items[path]['expand'] = not self.selected_items[path]['expand']
                     self.tree.set(item, 'expand', '✓' if self.selected_items[path]['expand'] else '')
+                    self.refresh_flags(path)
                     
     def get_item_path(self, item):
         path_parts = []
@@ -234,6 +217,7 @@ class FolderStructureGenerator:
             if path in self.selected_items:
                 self.selected_items[path]['include_structure'] = not self.selected_items[path]['include_structure']
                 self.tree.set(item, 'include_structure', '✓' if self.selected_items[path]['include_structure'] else '')
+                self.refresh_flags(path)
                 
     def toggle_content_selected(self):
         for item in self.tree.selection():
@@ -248,14 +232,17 @@ class FolderStructureGenerator:
             if path in self.selected_items and self.selected_items[path]['is_folder']:
                 self.selected_items[path]['expand'] = not self.selected_items[path]['expand']
                 self.tree.set(item, 'expand', '✓' if self.selected_items[path]['expand'] else '')
+                self.refresh_flags(path)
                 
     def select_children(self):
         for item in self.tree.selection():
             self.set_children_selection(item, True)
+            self.refresh_flags(self.get_item_path(item))
             
     def deselect_children(self):
         for item in self.tree.selection():
             self.set_children_selection(item, False)
+            self.refresh_flags(self.get_item_path(item))
             
     def set_children_selection(self, item, select):
         children = self.tree.get_children(item)
@@ -280,6 +267,7 @@ class FolderStructureGenerator:
     def set_all_selection(self, select):
         for item in self.tree.get_children():
             self.set_item_and_children_selection(item, select)
+        self.refresh_flags()
             
     def set_item_and_children_selection(self, item, select):
         path = self.get_item_path(item)
@@ -327,6 +315,7 @@ class FolderStructureGenerator:
             for path, item in self.selected_items.items():
                 if item['is_folder']:
                     item['expand'] = not item['expand']
+            self.refresh_flags()
             self.update_tree_display()
             
     def update_tree_display(self):
@@ -357,23 +346,14 @@ class FolderStructureGenerator:
         self.update_tree_display()
         self.status_bar.config(text="File extensions filter updated")
         
-    def is_path_under_collapsed_folder(self, file_path):
-        """Check if a file is under any collapsed (expand=False) folder"""
-        # Get all parent directories of the file
-        current_path = os.path.dirname(file_path)
-        
-        while current_path and current_path != self.base_folder:
-            # Check if this parent folder exists in selected_items and has expand=False
-            if current_path in self.selected_items:
-                if self.selected_items[current_path]['is_folder'] and not self.selected_items[current_path]['expand']:
-                    return True
-            # Move up to parent directory
-            parent = os.path.dirname(current_path)
-            if parent == current_path:  # Reached root
-                break
-            current_path = parent
-            
-        return False
+    def update_excludes(self):
+        exclude_text = self.exclude_entry.get()
+        self.exclude_patterns = [pattern.strip() for pattern in exclude_text.split(',') if pattern.strip()]
+        self.use_gitignore = self.gitignore_var.get()
+        
+        # Exclusion prunes the scan itself, so the tree has to be rebuilt
+        self.populate_tree()
+        self.status_bar.config(text="Exclusion filter updated")
         
     def generate_output(self):
         if not self.base_folder:
@@ -385,96 +365,6 @@ class FolderStructureGenerator:
         self.preview_text.insert(1.0, output)
         self.status_bar.config(text="Output generated successfully")
         
-    def generate_structure_output(self):
-        output = []
-        output.append("<PROJECT FOLDER STRUCTURE>")
-        
-        # Generate folder structure
-        structure_lines = self.generate_folder_structure(self.base_folder, "", True)
-        output.extend(structure_lines)
-        
-        # Generate file contents
-        output.append("\n<SELECTED FILES>")
-        
-        # Filter files: only include content if:
-        # 1. File has include_content=True
-        # 2. File is NOT under any collapsed folder
-        content_files = []
-        for path, item in self.selected_items.items():
-            if not item['is_folder'] and item['include_content']:
-                # Check if this file is under any collapsed folder
-                if not self.is_path_under_collapsed_folder(path):
-                    content_files.append(path)
-        
-        if not content_files:
-            output.append("(No file contents to display)")
-        else:
-            for file_path in content_files:
-                rel_path = os.path.relpath(file_path, os.path.dirname(self.base_folder))
-                output.append(f"\n{rel_path}")
-                output.append("-" * 50)
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        output.append(content)
-                except Exception as e:
-                    output.append(f"Error reading file: {str(e)}")
-                    
-                output.append("")
-            
-        return "\n".join(output)
-        
-    def generate_folder_structure(self, path, prefix="", is_last=True):
-        lines = []
-        
-        if path not in self.selected_items or not self.selected_items[path]['include_structure']:
-            return lines
-            
-        # Get the display name
-        if path == self.base_folder:
-            name = os.path.basename(path) + "/"
-            lines.append(name)
-            new_prefix = ""
-        else:
-            name = os.path.basename(path)
-            if self.selected_items[path]['is_folder']:
-                name += "/"
-                
-            connector = "└─ " if is_last else "├─ "
-            lines.append(prefix + connector + name)
-            
-            if is_last:
-                new_prefix = prefix + "   "
-            else:
-                new_prefix = prefix + "│  "
-                
-        # If it's a folder and should be expanded
-        if self.selected_items[path]['is_folder'] and self.selected_items[path]['expand']:
-            try:
-                items = []
-                for item in os.listdir(path):
-                    if item.startswith('.'):
-                        continue
-                    item_path = os.path.join(path, item)
-                    if item_path in self.selected_items and self.selected_items[item_path]['include_structure']:
-                        items.append((item, item_path, os.path.isdir(item_path)))
-                
-                # Sort: folders first, then files
-                items.sort(key=lambda x: (not x[2], x[0].lower()))
-                
-                for i, (item_name, item_path, is_dir) in enumerate(items):
-                    is_last_item = (i == len(items) - 1)
-                    child_lines = self.generate_folder_structure(item_path, new_prefix, is_last_item)
-                    lines.extend(child_lines)
-                    
-            except PermissionError:
-                lines.append(new_prefix + "└─ ... (permission denied)")
-        elif self.selected_items[path]['is_folder'] and not self.selected_items[path]['expand']:
-            lines.append(new_prefix + "└─ ... (content omitted)")
-            
-        return lines
-        
     def save_to_file(self):
         if not self.preview_text.get(1.0, tk.END).strip():
             messagebox.showwarning("No Content", "Please generate output first")
@@ -500,6 +390,7 @@ class FolderStructureGenerator:
         self.selected_items.clear()
         self.preview_text.delete(1.0, tk.END)
         self.base_folder = None
+        self.cache = None
         self.folder_label.config(text="No folder selected")
         self.status_bar.config(text="Cleared all data")
 
@@ -0,0 +1,149 @@
+"""
+Headless command-line entry point for the folder snapshot tool.
+
+Produces the same output as the GUI's "Generate Output" without importing tkinter,
+so it can run in batch jobs / CI. Several roots can be snapshotted in parallel:
+
+    python folder_cli.py repo_a repo_b -o snapshots/ -j 4 --exclude "*.log" --collapse "tests"
+"""
+import os
+import sys
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from snapshot import FolderSnapshot, DEFAULT_EXTENSIONS, PACK_RANKINGS
+from snapshot_cache import SnapshotCache, default_cache_path
+from ignore_rules import DEFAULT_EXCLUDES
+
+
+def parse_extensions(text):
+    return [ext.strip() for ext in text.split(',') if ext.strip()]
+
+
+def build_snapshot(root, options):
+    """Scan one root folder and render its snapshot text"""
+    snapshot = FolderSnapshot(os.path.abspath(root), options['extensions'])
+    snapshot.max_file_bytes = options['max_file_bytes']
+    snapshot.max_total_bytes = options['max_total_bytes']
+    snapshot.pack_budget_tokens = options['pack_tokens']
+    snapshot.pack_rank = options['rank']
+    snapshot.priority_patterns = options['priority']
+    snapshot.exclude_patterns = options['exclude']
+    snapshot.use_gitignore = options['gitignore']
+    if options['cache']:
+        snapshot.cache = SnapshotCache(default_cache_path(snapshot.base_folder, options['cache_dir']))
+    snapshot.scan()
+    snapshot.apply_rules(options['include'], options['collapse'])
+    text = snapshot.generate_structure_output()
+    if snapshot.dropped_files:
+        print(f"⚠️ {root}: {len(snapshot.dropped_files)} file(s) dropped to fit the token budget", file=sys.stderr)
+    return text
+
+
+def output_paths_for(roots, out_dir):
+    """{root: output file}, named after each root's folder; names shared by several roots
+    (e.g. /x/a/app and /x/b/app) get a short hash of the root's absolute path"""
+    folders = {root: os.path.abspath(root) for root in roots}
+    names = {folder: os.path.basename(folder) or "root" for folder in folders.values()}
+    taken = {}
+    for name in names.values():
+        taken[name] = taken.get(name, 0) + 1
+    paths = {}
+    for root, folder in folders.items():
+        name = names[folder]
+        if taken[name] > 1:
+            name += "-" + hashlib.sha1(folder.encode('utf-8')).hexdigest()[:8]
+        paths[root] = os.path.join(out_dir, f"{name}.txt")
+    return paths
+
+
+def write_output(text, file_path):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate folder structure & content snapshots without a GUI")
+    parser.add_argument('roots', nargs='+', help="folder(s) to snapshot")
+    parser.add_argument('-o', '--output',
+                        help="output file (single root) or directory (several roots); defaults to stdout")
+    parser.add_argument('--ext', default=", ".join(DEFAULT_EXTENSIONS),
+                        help="comma-separated file extensions whose content is included")
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                        help="only include content of files matching this glob (repeatable)")
+    parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                        help="prune files/folders matching this glob during the scan (repeatable)")
+    parser.add_argument('--no-default-excludes', action='store_true',
+                        help=f"don't prune the default excludes ({', '.join(DEFAULT_EXCLUDES)})")
+    parser.add_argument('--no-gitignore', action='store_true',
+                        help="don't prune paths excluded by .gitignore files")
+    parser.add_argument('--collapse', action='append', default=[], metavar='GLOB',
+                        help="show matching folders without expanding them (repeatable)")
+    parser.add_argument('--max-file-bytes', type=int, default=None,
+                        help="truncate each file's content to this many bytes (UTF-8)")
+    parser.add_argument('--max-total-bytes', type=int, default=None,
+                        help="stop adding file contents once this many bytes (UTF-8, headers not counted) are emitted")
+    parser.add_argument('--pack-tokens', type=int, default=None,
+                        help="include only the best-ranked files fitting this (estimated) token budget")
+    parser.add_argument('--rank', choices=PACK_RANKINGS, default='priority',
+                        help="how files are ranked when packing (default: priority, then tree order)")
+    parser.add_argument('--priority', action='append', default=[], metavar='GLOB',
+                        help="files matching this glob are packed first, in the order given (repeatable)")
+    parser.add_argument('--cache', action='store_true',
+                        help="reuse rendered sections of unchanged files from the previous run")
+    parser.add_argument('--cache-dir', default=None,
+                        help="where cache files are kept (implies --cache; default ~/.cache/folder_snapshot)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help="number of roots processed in parallel")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    for root in args.roots:
+        if not os.path.isdir(root):
+            print(f"❌ Not a folder: {root}", file=sys.stderr)
+            return 1
+
+    options = {
+        'extensions': parse_extensions(args.ext),
+        'include': args.include,
+        'exclude': args.exclude if args.no_default_excludes else DEFAULT_EXCLUDES + args.exclude,
+        'gitignore': not args.no_gitignore,
+        'collapse': args.collapse,
+        'max_file_bytes': args.max_file_bytes,
+        'max_total_bytes': args.max_total_bytes,
+        'pack_tokens': args.pack_tokens,
+        'rank': args.rank,
+        'priority': args.priority,
+        'cache': args.cache or args.cache_dir is not None,
+        'cache_dir': args.cache_dir,
+    }
+
+    if len(args.roots) == 1:
+        text = build_snapshot(args.roots[0], options)
+        if args.output:
+            write_output(text, args.output)
+        else:
+            sys.stdout.write(text + "\n")
+        return 0
+
+    if not args.output:
+        print("❌ --output must be a directory when several roots are given", file=sys.stderr)
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+
+    file_paths = output_paths_for(args.roots, args.output)
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs or 1)) as pool:
+        futures = {root: pool.submit(build_snapshot, root, options) for root in args.roots}
+        for root, future in futures.items():
+            file_path = file_paths[root]
+            write_output(future.result(), file_path)
+            print(f"✅ {root} -> {file_path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
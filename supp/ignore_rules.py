@@ -0,0 +1,106 @@
+import os
+import re
+
+# Folders that are never worth scanning (dependency trees, caches, build output)
+DEFAULT_EXCLUDES = ['node_modules', '__pycache__', 'venv', '*.egg-info']
+
+
+def translate_pattern(pattern):
+    """Translate a gitignore glob into a regex matching a forward-slash relative path"""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('/**', i) and i + 3 == len(pattern):
+            regex.append('/.*')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            regex.append('[^/]*')
+        elif c == '?':
+            regex.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return ''.join(regex)
+
+
+class IgnorePattern:
+    def __init__(self, line):
+        self.negate = line.startswith('!')
+        if self.negate:
+            line = line[1:]
+        self.dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        # A slash anywhere but the end anchors the pattern to the .gitignore's folder
+        anchored = '/' in line
+        line = line.lstrip('/')
+        prefix = '' if anchored else '(?:.*/)?'
+        self.regex = re.compile(prefix + translate_pattern(line) + '$')
+
+    def matches(self, rel_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(rel_path) is not None
+
+
+class IgnoreFile:
+    """Patterns of one .gitignore, matched against paths relative to the folder that holds it"""
+
+    def __init__(self, folder, lines):
+        self.folder = folder
+        self.patterns = []
+        for line in lines:
+            line = line.rstrip('\n').rstrip()
+            if not line or line.startswith('#'):
+                continue
+            self.patterns.append(IgnorePattern(line))
+
+    @classmethod
+    def load(cls, folder):
+        """Read folder/.gitignore, or return None if there is none"""
+        try:
+            with open(os.path.join(folder, '.gitignore'), 'r', encoding='utf-8', errors='ignore') as f:
+                return cls(folder, f.readlines())
+        except OSError:
+            return None
+
+    def match(self, path, is_dir):
+        """True/False for the last matching pattern (ignored / re-included), None if nothing matches"""
+        rel_path = os.path.relpath(path, self.folder).replace(os.sep, '/')
+        result = None
+        for pattern in self.patterns:
+            if pattern.matches(rel_path, is_dir):
+                result = not pattern.negate
+        return result
+
+
+def is_ignored(path, is_dir, ignore_files):
+    """Check a path against the .gitignore files above it (outermost first; deeper files win)"""
+    ignored = False
+    for ignore_file in ignore_files:
+        result = ignore_file.match(path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
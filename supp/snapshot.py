@@ -0,0 +1,368 @@
+import os
+import fnmatch
+
+from snapshot_cache import content_hash
+from ignore_rules import DEFAULT_EXCLUDES, IgnoreFile, is_ignored
+
+CHARS_PER_TOKEN = 4  # rough size estimate used when packing to a token budget
+PACK_RANKINGS = ('priority', 'recent', 'size')
+
+DEFAULT_EXTENSIONS = ['.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.h',
+                      '.txt', '.md', '.json', '.xml', '.yaml', '.yml']
+
+
+def matches_any(rel_path, patterns):
+    """Check a relative (forward-slash) path against glob patterns, by full path or by name"""
+    name = rel_path.rsplit('/', 1)[-1]
+    for pattern in patterns:
+        if fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+
+class FolderSnapshot:
+    """Scanning and rendering logic for folder snapshots, free of any GUI dependency"""
+
+    def __init__(self, base_folder=None, file_extensions=None):
+        self.base_folder = base_folder
+        self.selected_items = {}  # {path: {'include_structure': bool, 'include_content': bool, 'expand': bool, ...}}
+        self.file_extensions_to_include = list(file_extensions or DEFAULT_EXTENSIONS)
+        self.max_file_bytes = None   # truncate each file section to this many bytes
+        self.max_total_bytes = None  # stop adding file contents once this many bytes (UTF-8) are emitted
+        self.cache = None            # optional SnapshotCache reused across generate_structure_output calls
+        self.exclude_patterns = list(DEFAULT_EXCLUDES)  # globs pruned during the scan
+        self.use_gitignore = True    # also prune whatever .gitignore files in the tree exclude
+        self.pack_budget_tokens = None  # when set, only the best-ranked files fitting this budget are included
+        self.pack_rank = 'priority'     # one of PACK_RANKINGS
+        self.priority_patterns = []     # globs ranked first (in order) when packing
+        self.dropped_files = []         # (path, estimated tokens) left out by the last packing
+
+    def list_dir(self, path, ignore_files=()):
+        """Return (name, path, is_dir) for the visible, non-excluded entries of a folder, folders first"""
+        items = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):  # Skip hidden files
+                    continue
+                is_dir = entry.is_dir()
+                if self.is_excluded(entry.path, is_dir, ignore_files):
+                    continue
+                items.append((entry.name, entry.path, is_dir))
+
+        # Sort: folders first, then files
+        items.sort(key=lambda x: (not x[2], x[0].lower()))
+        return items
+
+    def is_excluded(self, path, is_dir, ignore_files=()):
+        """Should this entry (and, for a folder, its whole subtree) be left out of the scan?"""
+        if self.exclude_patterns and matches_any(self.rel_path(path), self.exclude_patterns):
+            return True
+        if ignore_files and is_ignored(path, is_dir, ignore_files):
+            return True
+        # Virtualenvs whatever their name
+        return is_dir and os.path.exists(os.path.join(path, 'pyvenv.cfg'))
+
+    def ignore_files_for(self, path, parent_ignore_files=()):
+        """The .gitignore files that apply inside path: the parent's plus path/.gitignore, if any"""
+        if not self.use_gitignore:
+            return parent_ignore_files
+        ignore_file = IgnoreFile.load(path)
+        if ignore_file is None:
+            return parent_ignore_files
+        return tuple(parent_ignore_files) + (ignore_file,)
+
+    def make_item(self, path, is_folder, parent=None):
+        if is_folder:
+            item = {
+                'include_structure': True,
+                'include_content': False,
+                'expand': True,
+                'is_folder': True,
+                'children': []
+            }
+        else:
+            ext = os.path.splitext(path)[1]
+            item = {
+                'include_structure': True,
+                'include_content': ext in self.file_extensions_to_include,
+                'expand': False,
+                'is_folder': False
+            }
+            # Recorded at scan time so packing can size sections without reading files
+            try:
+                stat = os.stat(path)
+                item['size'], item['mtime'] = stat.st_size, stat.st_mtime
+            except OSError:
+                item['size'], item['mtime'] = 0, 0
+        # Tree links and derived flags (kept up to date by refresh_flags)
+        item['parent'] = parent
+        item['under_collapsed'] = False  # some ancestor below the base folder has expand=False
+        item['visible'] = True           # item is shown in the folder structure
+        return item
+
+    def add_item(self, path, is_folder, parent):
+        """Register a scanned entry and link it under its parent folder"""
+        item = self.make_item(path, is_folder, parent)
+        self.selected_items[path] = item
+        self.selected_items[parent]['children'].append(path)
+        return item
+
+    def rel_path(self, path):
+        """Path relative to the base folder, with forward slashes (used for glob matching)"""
+        return os.path.relpath(path, self.base_folder).replace(os.sep, '/')
+
+    # --------------------------
+    # SCANNING
+    # --------------------------
+    def scan(self):
+        """Populate selected_items for the whole base folder without any UI"""
+        self.selected_items.clear()
+        if not self.base_folder:
+            return
+        self.selected_items[self.base_folder] = self.make_item(self.base_folder, True)
+        self.scan_folder(self.base_folder)
+        self.refresh_flags()
+
+    def scan_folder(self, path, ignore_files=()):
+        # Excluded entries are pruned before they are registered, so their subtrees are never walked
+        ignore_files = self.ignore_files_for(path, ignore_files)
+        try:
+            for item_name, item_path, is_dir in self.list_dir(path, ignore_files):
+                self.add_item(item_path, is_dir, path)
+                if is_dir:
+                    self.scan_folder(item_path, ignore_files)
+        except PermissionError:
+            self.selected_items[path]['unreadable'] = True
+
+    def refresh_flags(self, path=None):
+        """
+        Recompute the derived 'under_collapsed' / 'visible' flags for the subtree at path
+        (the whole tree by default). Call after changing 'expand' or 'include_structure'.
+        """
+        if path is None:
+            path = self.base_folder
+        if path not in self.selected_items:
+            return
+
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            item = self.selected_items[current]
+            parent = self.selected_items.get(item['parent'])
+            if parent is None:
+                item['under_collapsed'] = False
+                item['visible'] = item['include_structure']
+            else:
+                # The base folder's own expand flag only affects the structure listing
+                item['under_collapsed'] = item['parent'] != self.base_folder and (
+                    parent['under_collapsed'] or not parent['expand'])
+                item['visible'] = parent['visible'] and parent['expand'] and item['include_structure']
+            if item['is_folder']:
+                stack.extend(item['children'])
+
+    def apply_rules(self, include=None, collapse=None):
+        """
+        Apply glob rules to the scanned items (exclusion already happened during the scan):
+        - include: only matching files keep their content (extension filter still applies)
+        - collapse: matching folders are shown but not expanded
+        """
+        for path, item in self.selected_items.items():
+            if path == self.base_folder:
+                continue
+            rel = self.rel_path(path)
+            if item['is_folder']:
+                if collapse and matches_any(rel, collapse):
+                    item['expand'] = False
+            elif include and item['include_content'] and not matches_any(rel, include):
+                item['include_content'] = False
+
+        self.refresh_flags()
+
+    # --------------------------
+    # RENDERING
+    # --------------------------
+    def is_path_under_collapsed_folder(self, file_path):
+        """Check if a file is under any collapsed (expand=False) folder"""
+        item = self.selected_items.get(file_path)
+        return bool(item and item['under_collapsed'])
+
+    def read_file_content(self, file_path):
+        if self.max_file_bytes is None:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read()
+        # Limit in UTF-8 bytes, not characters: read raw bytes (a character cut in half is dropped)
+        with open(file_path, 'rb') as f:
+            data = f.read(self.max_file_bytes + 1)
+        content = data[:self.max_file_bytes].decode('utf-8', errors='ignore')
+        content = content.replace('\r\n', '\n').replace('\r', '\n')  # as text mode would
+        if len(data) > self.max_file_bytes:
+            content += "\n... (truncated)"
+        return content
+
+    def section_header(self, file_path):
+        rel_path = os.path.relpath(file_path, os.path.dirname(self.base_folder))
+        return f"\n{rel_path}\n" + "-" * 50
+
+    def render_file_section(self, file_path):
+        """Render one file's block of the <SELECTED FILES> section, reusing the cache when the file is unchanged"""
+        rel_path = os.path.relpath(file_path, os.path.dirname(self.base_folder))
+        header = self.section_header(file_path)
+        key = f"{rel_path}|{self.max_file_bytes}"
+
+        stat = None
+        if self.cache is not None:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                stat = None
+            if stat is not None:
+                section = self.cache.get_section(file_path, stat, key)
+                if section is not None:
+                    return section
+
+        try:
+            content = self.read_file_content(file_path)
+        except Exception as e:
+            return f"{header}\nError reading file: {str(e)}\n"
+
+        if stat is None:
+            return f"{header}\n{content}\n"
+
+        digest = content_hash(content)
+        section = self.cache.get_section_by_hash(file_path, digest, key)
+        if section is None:
+            section = f"{header}\n{content}\n"
+        self.cache.store(file_path, stat, digest, key, section)
+        return section
+
+    # --------------------------
+    # PACKING
+    # --------------------------
+    def estimate_tokens(self, file_path):
+        """Estimated size of a file's section, from the size recorded at scan time"""
+        rel_path = os.path.relpath(file_path, os.path.dirname(self.base_folder))
+        size = self.selected_items[file_path]['size']
+        if self.max_file_bytes is not None:
+            size = min(size, self.max_file_bytes)
+        return (len(rel_path) + 53 + size) // CHARS_PER_TOKEN + 1
+
+    def rank_key(self, file_path):
+        item = self.selected_items[file_path]
+        if self.pack_rank == 'recent':
+            return -item['mtime']
+        if self.pack_rank == 'size':
+            return item['size']
+        # priority: index of the first matching pattern, unmatched files last
+        rel = self.rel_path(file_path)
+        for index, pattern in enumerate(self.priority_patterns):
+            if matches_any(rel, [pattern]):
+                return index
+        return len(self.priority_patterns)
+
+    def pack_files(self, content_files):
+        """
+        Greedily fill pack_budget_tokens with the best-ranked files.
+        Returns (kept files in their original order, [(dropped path, estimated tokens)]).
+        """
+        budget = self.pack_budget_tokens
+        ranked = sorted(content_files, key=self.rank_key)  # stable: ties keep tree order
+        kept, dropped = set(), []
+        for file_path in ranked:
+            tokens = self.estimate_tokens(file_path)
+            if tokens <= budget:
+                kept.add(file_path)
+                budget -= tokens
+            else:
+                dropped.append((file_path, tokens))
+        return [path for path in content_files if path in kept], dropped
+
+    def generate_structure_output(self):
+        output = []
+        output.append("<PROJECT FOLDER STRUCTURE>")
+
+        # Generate folder structure
+        structure_lines = self.generate_folder_structure(self.base_folder, "", True)
+        output.extend(structure_lines)
+
+        # Generate file contents
+        output.append("\n<SELECTED FILES>")
+
+        # Filter files: only include content if:
+        # 1. File has include_content=True
+        # 2. File is NOT under any collapsed folder
+        content_files = []
+        for path, item in self.selected_items.items():
+            if not item['is_folder'] and item['include_content']:
+                # Check if this file is under any collapsed folder
+                if not self.is_path_under_collapsed_folder(path):
+                    content_files.append(path)
+
+        self.dropped_files = []
+        if self.pack_budget_tokens is not None:
+            content_files, self.dropped_files = self.pack_files(content_files)
+
+        if not content_files:
+            output.append("(No file contents to display)")
+        else:
+            total_bytes = 0
+            for index, file_path in enumerate(content_files):
+                if self.max_total_bytes is not None and total_bytes >= self.max_total_bytes:
+                    output.append(f"\n... ({len(content_files) - index} more file(s) omitted, byte budget reached)")
+                    break
+
+                section = self.render_file_section(file_path)
+                output.append(section)
+                # File contents only (UTF-8 bytes), not the section's header and framing newlines
+                total_bytes += len(section.encode('utf-8')) - len(self.section_header(file_path).encode('utf-8')) - 2
+
+        if self.dropped_files:
+            output.append(f"\n<DROPPED FILES> ({len(self.dropped_files)} file(s) over the {self.pack_budget_tokens} token budget)")
+            for file_path, tokens in self.dropped_files:
+                rel_path = os.path.relpath(file_path, os.path.dirname(self.base_folder))
+                output.append(f"{rel_path} (~{tokens} tokens)")
+
+        if self.cache is not None:
+            self.cache.save(keep_paths=self.selected_items)
+
+        return "\n".join(output)
+
+    def generate_folder_structure(self, path, prefix="", is_last=True):
+        lines = []
+
+        item = self.selected_items.get(path)
+        if item is None or not item['visible']:
+            return lines
+
+        # Get the display name
+        if path == self.base_folder:
+            name = os.path.basename(path) + "/"
+            lines.append(name)
+            new_prefix = ""
+        else:
+            name = os.path.basename(path)
+            if item['is_folder']:
+                name += "/"
+
+            connector = "└─ " if is_last else "├─ "
+            lines.append(prefix + connector + name)
+
+            if is_last:
+                new_prefix = prefix + "   "
+            else:
+                new_prefix = prefix + "│  "
+
+        # If it's a folder and should be expanded
+        if item['is_folder'] and item['expand']:
+            if item.get('unreadable'):
+                lines.append(new_prefix + "└─ ... (permission denied)")
+            else:
+                # Children are stored in display order (folders first, then files)
+                items = [child for child in item['children'] if self.selected_items[child]['visible']]
+                for i, item_path in enumerate(items):
+                    is_last_item = (i == len(items) - 1)
+                    child_lines = self.generate_folder_structure(item_path, new_prefix, is_last_item)
+                    lines.extend(child_lines)
+        elif item['is_folder'] and not item['expand']:
+            lines.append(new_prefix + "└─ ... (content omitted)")
+
+        return lines
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import hashlib
+
+CACHE_VERSION = 3  # 2: max_file_bytes counts UTF-8 bytes (was characters); 3: SQLite instead of one JSON file
+
+
+def default_cache_path(base_folder, cache_dir=None):
+    """Per-folder cache database (under ~/.cache by default), so snapshots never write into the scanned tree"""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "folder_snapshot")
+    digest = hashlib.sha1(os.path.abspath(base_folder).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{digest}.sqlite3")
+
+
+def content_hash(content):
+    return hashlib.sha1(content.encode('utf-8', errors='ignore')).hexdigest()
+
+
+class SnapshotCache:
+    """
+    Persistent cache of rendered file sections, keyed by path, in a SQLite database.
+    Each row stores the file's mtime, size, content hash and rendered section;
+    a file is only reread when its mtime or size changed since the last run.
+    Lookups and writes touch only the rows of the files involved, so a run over a
+    large, mostly unchanged tree never reads or rewrites the whole cache.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.conn = None
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        try:
+            self.conn = self.connect()
+        except sqlite3.DatabaseError:  # not a cache database (e.g. a corrupt file): start over
+            os.remove(self.cache_path)
+            self.conn = self.connect()
+
+    def connect(self):
+        conn = sqlite3.connect(self.cache_path)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            conn.execute("DROP TABLE IF EXISTS sections")
+            conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sections ("
+            "path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, hash TEXT, key TEXT, section TEXT)"
+        )
+        conn.commit()
+        return conn
+
+    def save(self, keep_paths=None):
+        """Commit this run's changes, dropping entries for paths no longer selected"""
+        if keep_paths is not None:
+            stale = [(path,) for (path,) in self.conn.execute("SELECT path FROM sections") if path not in keep_paths]
+            self.conn.executemany("DELETE FROM sections WHERE path = ?", stale)
+        self.conn.commit()
+
+    def get_section(self, path, stat, key):
+        """Return the cached section if the file is unchanged (same mtime and size) and rendered with the same key"""
+        row = self.conn.execute(
+            "SELECT section FROM sections WHERE path = ? AND key = ? AND mtime = ? AND size = ?",
+            (path, key, stat.st_mtime_ns, stat.st_size)
+        ).fetchone()
+        if row:
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        return None
+
+    def get_section_by_hash(self, path, digest, key):
+        """Reuse a rendered section when the file was touched but its content is identical"""
+        row = self.conn.execute(
+            "SELECT section FROM sections WHERE path = ? AND key = ? AND hash = ?", (path, key, digest)
+        ).fetchone()
+        return row[0] if row else None
+
+    def store(self, path, stat, digest, key, section):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sections (path, mtime, size, hash, key, section) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, stat.st_mtime_ns, stat.st_size, digest, key, section)
+        )